@@ -0,0 +1,199 @@
+"""Runs many headless games at once, one per process, and sums up how they went.
+
+The game keeps its state in module level singletons (Display, EventHandler, EnemyManager,
+...), so only one game can run in a process. Each scenario is run in a fresh worker process
+(a multiprocessing pool with maxtasksperchild=1), so no state carries over between them.
+
+A scenario is a map (board size and routes), a seed, scripted tower placements and how many
+waves to play. Run from src:
+
+    python batch_runner.py --count 32 --waves 5
+    python batch_runner.py --scenarios scenarios.json --output results.json
+
+A scenarios file is a JSON list of objects with the fields of Scenario (any left out take
+their defaults), eg
+
+    [{"name": "lane", "seed": 1, "size": [20, 10], "towers": [[1, "TestTower", [5, 4]]]}]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import traceback
+from collections import namedtuple
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+# pylint: disable=wrong-import-position
+from engine.clock import Clock
+from engine.display import Display
+from engine.vector2 import Vector2
+
+from board import Route
+from enemy_manager import EnemyManager
+from game import Game, States
+from test_tower import TestTower
+from tower import Tower
+
+TOWERS = {tower.__name__: tower for tower in (Tower, TestTower)}
+
+# name: shown in the results.
+# seed: for the random tower placements.
+# size: (width, height) of the board.
+# routes: [(entries, exits)], each a list of (x, y) cells - None for the default route.
+# towers: [(wave, tower name, (x, y))] - placed (if they fit) before the wave is sent.
+# random_towers: how many towers (of the first type in TOWERS) to place on random cells
+#     before the first wave.
+# waves: how many waves to play.
+# max_ticks: give up after this many ticks.
+Scenario = namedtuple("Scenario", ("name", "seed", "size", "routes", "towers", "random_towers",
+                                   "waves", "max_ticks"),
+                      defaults=(0, (12, 8), None, (), 0, 5, 100000))
+
+
+def make_scenarios(count, waves):
+    """count scenarios of random maps and tower placements, seeded 0 to count - 1."""
+    scenarios = []
+    for seed in range(count):
+        rng = random.Random(seed)
+        size = (rng.choice((12, 20, 40)), rng.choice((8, 12, 20)))
+        scenarios.append(Scenario("random {}".format(seed), seed, size,
+                                  random_towers=rng.randrange(size[0] * size[1] // 4),
+                                  waves=waves))
+    return scenarios
+
+
+def load_scenarios(path):
+    """The scenarios in the JSON file."""
+    with open(path) as file:
+        return [Scenario(**fields) for fields in json.load(file)]
+
+
+def run_scenario(scenario):
+    """Play the scenario to the end in a new headless game.
+    Returns a dict of the results, with "error" set if the game failed."""
+    start_time = time.perf_counter()
+    result = {"name": scenario.name, "seed": scenario.seed, "waves": [], "towers": 0}
+    try:
+        Display.start(headless=True)
+        game = Game()
+        game.start()
+        board = game.board
+        if tuple(scenario.size) != (board.size.x, board.size.y):
+            board.size = Vector2(*scenario.size)
+            board.initialize_board()
+        if scenario.routes is not None:
+            board.set_routes([Route(tuple(Vector2(*cell) for cell in entries),
+                                    tuple(Vector2(*cell) for cell in exits))
+                              for entries, exits in scenario.routes])
+        game.update_path()
+        place_random_towers(game, scenario)
+
+        for wave_number in range(1, scenario.waves + 1):
+            for wave, tower_name, cell in scenario.towers:
+                if wave == wave_number:
+                    place_tower(game, TOWERS[tower_name], Vector2(*cell))
+            result["towers"] = len(board.towers)
+            killed, leaked, start_tick = EnemyManager.killed, EnemyManager.leaked, Clock.tick
+            game.start_wave()
+            while game.is_in_state(States.in_play) and Clock.tick < scenario.max_ticks:
+                game.update()
+                Clock.step()
+            result["waves"].append({"killed": EnemyManager.killed - killed,
+                                    "leaked": EnemyManager.leaked - leaked,
+                                    "ticks": Clock.tick - start_tick})
+            if game.is_in_state(States.in_play):
+                result["error"] = "Ran out of ticks in wave {}".format(wave_number)
+                break
+    except Exception:  # pylint: disable=broad-except
+        result["error"] = traceback.format_exc()
+    result["killed"] = sum(wave["killed"] for wave in result["waves"])
+    result["leaked"] = sum(wave["leaked"] for wave in result["waves"])
+    result["ticks"] = Clock.tick
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def place_tower(game, tower, cell):
+    """Make the tower at cell if it's free and on the board and wouldn't block the path.
+    Returns whether it was made."""
+    if not game.board.is_on_board(cell) or not game.try_make_tower(tower, cell):
+        return False
+    game.update_path()
+    return True
+
+
+def place_random_towers(game, scenario):
+    """Place scenario.random_towers towers on random cells, giving up after a few misses
+    for each."""
+    rng = random.Random(scenario.seed)
+    tower = next(iter(TOWERS.values()))
+    placed = 0
+    for _ in range(scenario.random_towers * 4):
+        if placed == scenario.random_towers:
+            break
+        cell = Vector2(rng.randrange(game.board.size.x), rng.randrange(game.board.size.y))
+        placed += place_tower(game, tower, cell)
+
+
+def run_batch(scenarios, processes=None):
+    """Run every scenario, processes (default one per core) at a time.
+    Returns the list of results, in the order of scenarios."""
+    # A new process per scenario - the game's singletons can't be reset between games
+    with multiprocessing.Pool(processes, maxtasksperchild=1) as pool:
+        return pool.map(run_scenario, scenarios, chunksize=1)
+
+
+def summarise(results, duration):
+    """Totals and means over the results. duration is the real seconds the batch took."""
+    finished = [result for result in results if "error" not in result]
+    killed = sum(result["killed"] for result in finished)
+    leaked = sum(result["leaked"] for result in finished)
+    cpu_seconds = sum(result["seconds"] for result in results)
+    return {
+        "scenarios": len(results),
+        "failed": [result["name"] for result in results if "error" in result],
+        "killed": killed,
+        "leaked": leaked,
+        "leak_rate": leaked / (killed + leaked) if killed + leaked else 0,
+        "mean_waves": sum(len(result["waves"]) for result in finished) / max(len(finished), 1),
+        "mean_towers": sum(result["towers"] for result in finished) / max(len(finished), 1),
+        "ticks": sum(result["ticks"] for result in results),
+        "seconds": duration,
+        "speedup": cpu_seconds / duration if duration else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", metavar="PATH",
+                        help="JSON list of scenarios to run (default random ones, see --count)")
+    parser.add_argument("--count", type=int, default=os.cpu_count(),
+                        help="how many random scenarios to run (default one per core)")
+    parser.add_argument("--waves", type=int, default=5,
+                        help="waves each random scenario plays (default 5)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="how many games to run at once (default one per core)")
+    parser.add_argument("--output", metavar="PATH",
+                        help="write every scenario's results and the summary here as JSON")
+    args = parser.parse_args()
+
+    batch = load_scenarios(args.scenarios) if args.scenarios else \
+        make_scenarios(args.count, args.waves)
+    batch_start = time.perf_counter()
+    batch_results = run_batch(batch, args.processes)
+    summary = summarise(batch_results, time.perf_counter() - batch_start)
+
+    for batch_result in batch_results:
+        if "error" in batch_result:
+            print("{} failed:\n{}".format(batch_result["name"], batch_result["error"]),
+                  file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"summary": summary, "results": batch_results}, output_file, indent=2)
+    if summary["failed"]:
+        sys.exit(1)
@@ -0,0 +1,246 @@
+"""Benchmark suite for the hot parts of the game, run headless.
+
+Measures path finding, the connectivity index, projectiles, UI layout and whole frames, and
+prints the results as JSON (seconds per call, lower is better). Results can be saved as a
+baseline and later runs compared against it. Run from src:
+
+    python -m benchmarks.run --save-baseline baseline.json
+    ... change things ...
+    python -m benchmarks.run --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+# pylint: disable=wrong-import-position
+import numpy as np
+
+from engine.clock import Clock
+from engine.display import Display
+from engine.rect import Rect
+from engine.ui_element import UIElement
+from engine.vector2 import Vector2
+
+from board import Board
+from connectivity_index import ConnectivityIndex
+from enemy import Enemy
+from enemy_manager import EnemyManager
+from game import Game
+from path_finder import PathFinder
+from projectile_manager import ProjectileManager
+from test_tower import TestProjectile, TestTower
+
+BOARD_SIZES = ((12, 8), (50, 50), (200, 200), (1000, 1000))
+PROJECTILE_COUNTS = (1000, 10000, 100000)
+TREE_DEPTHS = (5, 50)
+OBSTACLE_DENSITY = 0.2
+FRAME_ENEMIES = 100  # Enemies on the board while frames are measured
+FRAME_WARMUP_TICKS = 300  # Ticks to spread them along the path before measuring
+
+
+class BenchmarkEnemy(Enemy):
+    """Can't be killed, and too slow to get across the board in the warm up and measured
+    ticks, so every measured frame has the same enemies on the board."""
+
+    speed = 1.5
+    health = 1e9
+
+
+def measure(function, number=1, repeat=3, setup=None):
+    """Seconds per call of function - the best of repeat runs of number calls.
+    setup, if given, is called (untimed) before each run to give it the same work."""
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        duration = (time.perf_counter() - start) / number
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def make_board(size, density, seed):
+    """A standalone board of size (w, h) with density of its cells randomly occupied."""
+    board = Board(Rect(0.5, 0.5, 1, 1))
+    board.size = Vector2(*size)
+    board.initialize_board()
+    rng = random.Random(seed)
+    for y in range(size[1]):
+        for x in range(size[0]):
+            if rng.random() < density:
+                board.set_cell_contents(True, Vector2(x, y))
+    return board
+
+
+def bench_path_finding(results, quick):
+    """PathFinder.find_path on boards with random obstacles."""
+    for size in BOARD_SIZES[:-1] if quick else BOARD_SIZES:
+        board = make_board(size, OBSTACLE_DENSITY, seed=size[0])
+        repeat = 1 if size[0] * size[1] > 100000 else 3
+        results["path_finding/{}x{}".format(*size)] = measure(
+            lambda: PathFinder.find_path(board), repeat=repeat)
+
+
+def bench_connectivity(results, quick):
+    """ConnectivityIndex on boards with random obstacles: building it, and a tower placed on
+    its path then removed with would_block asked after each edit (as hovering does)."""
+    for size in BOARD_SIZES[:-1] if quick else BOARD_SIZES:
+        board = make_board(size, OBSTACLE_DENSITY, seed=size[0])
+        index = ConnectivityIndex(board)
+        name = "{}x{}".format(*size)
+
+        def build(index=index):
+            index.dirty = True
+            index.update()
+
+        results["connectivity/build/" + name] = measure(build)
+        path = PathFinder.find_path(board)
+        cells = path[1:-1:max(1, len(path) // 20)]
+
+        def edit(board=board, index=index, cells=cells):
+            for cell in cells:
+                if not index.would_block(cell):
+                    board.set_cell_contents(True, cell)
+                    index.would_block(cells[0])
+                    board.set_cell_contents(None, cell)
+                    index.would_block(cells[0])
+
+        results["connectivity/edit/" + name] = measure(edit, 10) / len(cells)
+
+
+def bench_projectiles(results, game):
+    """ProjectileManager.update and show_projectiles with many projectiles on the board."""
+    rng = np.random.default_rng(0)
+    size = (game.board.size.x, game.board.size.y)
+    for count in PROJECTILE_COUNTS:
+        ProjectileManager.clear()
+        ProjectileManager.add_projectiles(TestProjectile, rng.random((count, 2)) * size,
+                                          rng.random((count, 2)) * size)
+        results["projectiles/update/{}".format(count)] = measure(ProjectileManager.update, 10)
+        results["projectiles/show/{}".format(count)] = measure(
+            lambda: ProjectileManager.show_projectiles(game.board), 3)
+    ProjectileManager.clear()
+
+
+def bench_layout(results):
+    """UIElement.get_final_rect at the bottom of a chain of nested elements, both working
+    the layout out (cold) and reading the cached rect (warm)."""
+    for depth in TREE_DEPTHS:
+        element = UIElement(Rect(0, 0, 100, 100))
+        for _ in range(depth):
+            child = UIElement(Rect(1, 1, 100, 100))
+            child.parent = element
+            element = child
+
+        def cold(element=element):
+            UIElement.invalidate_all_layouts()
+            element.get_final_rect()
+
+        results["layout/cold/depth {}".format(depth)] = measure(cold, 100)
+        results["layout/warm/depth {}".format(depth)] = measure(element.get_final_rect, 1000)
+
+
+def bench_frames(results, game):
+    """Whole frames - events, game logic and drawing - with FRAME_ENEMIES enemies spread
+    along the path of a board with some towers."""
+    rng = random.Random(0)
+    for _ in range(20):
+        cell = Vector2(rng.randrange(game.board.size.x), rng.randrange(game.board.size.y))
+        game.try_make_tower(TestTower, cell)
+    game.update_path()
+
+    def send_enemies():
+        """Replace the enemies and projectiles with new benchmark enemies, spawned one at a
+        time so they're spread along the path."""
+        EnemyManager.clear()
+        ProjectileManager.clear()
+        interval = FRAME_WARMUP_TICKS // FRAME_ENEMIES
+        for tick in range(FRAME_WARMUP_TICKS):
+            if tick % interval == 0:
+                EnemyManager.spawn(BenchmarkEnemy, 1)
+            game.update()
+            Clock.step()
+        game.show()
+
+    def frame():
+        game.update()
+        Clock.step()
+        game.show()
+
+    results["frame/update"] = measure(lambda: (game.update(), Clock.step()), 100,
+                                      setup=send_enemies)
+    results["frame/full"] = measure(frame, 100, setup=send_enemies)
+    EnemyManager.clear()
+    ProjectileManager.clear()
+
+
+def run(quick=False):
+    """Run every benchmark. Returns {benchmark: seconds per call}."""
+    # Not headless mode - with the dummy driver there's still a window to draw frames to
+    Display.start()
+    game = Game()
+    game.start()
+
+    results = {}
+    bench_path_finding(results, quick)
+    bench_connectivity(results, quick)
+    bench_projectiles(results, game)
+    bench_layout(results)
+    bench_frames(results, game)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print each result against the baseline. Returns the names of the benchmarks more
+    than tolerance times slower than their baseline."""
+    slower = []
+    print("{:<32}{:>12}{:>12}{:>8}".format("", "baseline", "now", "ratio"), file=sys.stderr)
+    for name, seconds in results.items():
+        if name not in baseline:
+            print("{:<32}{:>12}{:>12.3g}".format(name, "-", seconds), file=sys.stderr)
+            continue
+        ratio = seconds / baseline[name]
+        print("{:<32}{:>12.3g}{:>12.3g}{:>8.2f}".format(name, baseline[name], seconds, ratio),
+              file=sys.stderr)
+        if ratio > tolerance:
+            slower.append(name)
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true",
+                        help="skip the largest path finding and connectivity board")
+    parser.add_argument("--output", help="write the results JSON here as well as stdout")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="save the results as the baseline to compare later runs with")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="compare the results with a saved baseline, failing if any "
+                             "are slower than --tolerance allows")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="how many times slower than the baseline counts as slower "
+                             "(default 1.25)")
+    args = parser.parse_args()
+
+    benchmark_results = run(args.quick)
+    output = json.dumps(benchmark_results, indent=2)
+    print(output)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                file.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            slower_results = compare(benchmark_results, json.load(file), args.tolerance)
+        if slower_results:
+            print("Slower than the baseline: " + ", ".join(slower_results), file=sys.stderr)
+            sys.exit(1)
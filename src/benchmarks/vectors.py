@@ -0,0 +1,96 @@
+"""Benchmark Vector2 and Rect against the dict-backed classes they replaced.
+
+Run from src:
+
+    python -m benchmarks.vectors
+"""
+import timeit
+import tracemalloc
+
+from engine.rect import Rect
+from engine.vector2 import Vector2
+
+
+class DictVector2:
+    """The old dict-backed Vector2, for comparison."""
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __add__(self, other):
+        return DictVector2(self.x + other.x, self.y + other.y)
+
+    def __mul__(self, other):
+        return DictVector2(self.x * other, self.y * other)
+
+    def __eq__(self, other):
+        return self.x == other.x and self.y == other.y
+
+    @staticmethod
+    def one():
+        return DictVector2(1, 1)
+
+
+class DictRect:
+    """The old dict-backed Rect, for comparison."""
+
+    def __init__(self, x=0, y=0, w=0, h=0):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+
+    def __add__(self, other):
+        return DictRect(self.x + other.x, self.y + other.y, self.w + other.w, self.h + other.h)
+
+
+def measure_memory(function, count=100000):
+    """Bytes allocated per object when keeping count of the objects function makes."""
+    tracemalloc.start()
+    objects = [function(i) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def measure_time(statement, setup_globals, number=100000):
+    """Seconds per run of statement."""
+    return min(timeit.repeat(statement, globals=setup_globals, number=number, repeat=3)) / number
+
+
+def run():
+    """Measure both implementations. Returns {benchmark: (old, new)}."""
+    results = {}
+    results["vector bytes"] = (measure_memory(lambda i: DictVector2(i, i)),
+                               measure_memory(lambda i: Vector2(i, i)))
+    results["rect bytes"] = (measure_memory(lambda i: DictRect(i, i, i, i)),
+                             measure_memory(lambda i: Rect(i, i, i, i)))
+    results["one() bytes"] = (measure_memory(lambda i: DictVector2.one()),
+                              measure_memory(lambda i: Vector2.one()))
+
+    old = {"a": DictVector2(1, 2), "b": DictVector2(3, 4), "V": DictVector2,
+           "r": DictRect(1, 2, 3, 4)}
+    new = {"a": Vector2(1, 2), "b": Vector2(3, 4), "V": Vector2, "r": Rect(1, 2, 3, 4)}
+    for name, statement in (("vector (a + b) * 2 s", "(a + b) * 2"),
+                            ("a + V.one() s", "a + V.one()"),
+                            ("rect r + r s", "r + r")):
+        results[name] = (measure_time(statement, old), measure_time(statement, new))
+
+    # The old vectors can't be hashed so path finding kept a list of them; now they can go
+    # in a set
+    cells = [(x, y) for x in range(30) for y in range(30)]
+    old_visited = [DictVector2(x, y) for x, y in cells]
+    new_visited = {Vector2(x, y) for x, y in cells}
+    results["visited lookup s"] = (
+        measure_time("V(29, 29) in visited", {"V": DictVector2, "visited": old_visited}, 1000),
+        measure_time("V(29, 29) in visited", {"V": Vector2, "visited": new_visited}, 1000))
+    return results
+
+
+if __name__ == "__main__":
+    print("{:<24}{:>14}{:>14}{:>10}".format("", "dict-backed", "slots", "ratio"))
+    for name, (old_result, new_result) in run().items():
+        print("{:<24}{:>14.3g}{:>14.3g}{:>10.2f}".format(
+            name, old_result, new_result, new_result / old_result))
@@ -1,27 +1,74 @@
+import math
+from collections import namedtuple, OrderedDict
+
+import numpy as np
 import pygame
+from engine.camera import Camera
 from engine.vector2 import Vector2
 from engine.rect import Rect
 from engine.display import Display
 from engine.event_handler import EventHandler
 from engine.ui_element import UIElement
 
+# Steps a path can take between cells - (dx, dy)
+DIRECTIONS = ((-1, 0), (1, 0), (0, 1), (0, -1))
+
+# A way across the board: enemies come on from any of entries and leave from any of exits.
+# Both are tuples of Vector2 cells. Exits are on the board; entries can be on the board or
+# just off it, in which case they step on to the board cells next to them.
+Route = namedtuple("Route", ("entries", "exits"))
+
 
 class Board(UIElement):
 
     # Board logic
     size = None
     items = None
+    occupancy = None  # uint8 array indexed [y, x], 1 where items has something, kept in sync
+    towers = None  # position -> item, for every occupied cell, kept in sync
+    routes = None  # Routes across the board, see set_routes
+    change_listeners = None
 
     # GUI
     mouse_cell = None
+    mouse_position = (0, 0)  # Where the mouse was last seen (pixels on the display)
+    mouse_cell_blocked = False  # Would a tower on the mouse cell block the path?
+    camera = None  # Pan (middle mouse drag) and zoom (mouse wheel) over the board
+    zoom_step = 1.25  # Zoom factor per mouse wheel click
+
+    # Cached layer - the background, grid and towers, drawn in chunks of chunk_pixels x
+    # chunk_pixels pixels (a cell can span several), each drawn once and then only where
+    # changed. Only the chunks in view are drawn. Every chunk in view is kept, and at most
+    # max_chunks in all if fewer are in view (least recently shown dropped first).
+    background_color = (200, 200, 200)
+    grid_color = (150, 150, 150)
+    chunk_pixels = 256
+    max_chunks = 64
+    _chunks = None  # (chunk x, chunk y) -> pygame.Surface
+    _chunk_cell_size = None  # Cell size in pixels the chunks were drawn at
+    _visible_chunks = ()  # Chunks shown by the last show_layer
+    _layer_rect = None  # pygame tuple of the board rect the layer was last shown at
+    _changed_cells = None  # Cells to redraw in the layer
+
+    # get_scaled_board_rect cache, kept until the final rect, size or camera changes
+    _board_rect = None
+    _board_rect_source = None
 
     def init(self, size=Vector2(12, 8)):
         # Board logic
         self.size = size
+        self.change_listeners = []
+        self._changed_cells = []
+        self._chunks = OrderedDict()
+        self.camera = Camera()
+        self.add_change_listener(self.layer_cell_changed)
         self.initialize_board()
 
         # GUI
+        # pylint: disable=no-member
         EventHandler.add_listener(pygame.MOUSEMOTION, self.mouse_motion_listener)
+        EventHandler.add_listener(pygame.MOUSEWHEEL, self.mouse_wheel_listener)
+        EventHandler.add_listener(pygame.KEYDOWN, self.key_down_listener)
 
     def initialize_board(self):
         """Set the items list to a 2D list of size filled with None.
@@ -29,15 +76,86 @@ class Board(UIElement):
         self.items = []
         for y in range(self.size.y):
             self.items.append([None, ] * self.size.x)
+        self.occupancy = np.zeros((self.size.y, self.size.x), dtype=np.uint8)
+        self.towers = {}
+        self.routes = [self.get_default_route()]
+        self.on_change(None)
+
+    def add_change_listener(self, function):
+        """Call function whenever the board contents change.
+        The function is given the position of the changed cell, or None if the whole board
+        changed."""
+        self.change_listeners.append(function)
+
+    def on_change(self, position):
+        """Tell the change listeners that position (or the whole board if None) changed."""
+        for function in self.change_listeners:
+            function(position)
 
     def set_cell_contents(self, obj, position):
         """Set the item in cell."""
         self.items[position.y][position.x] = obj
+        self.occupancy[position.y, position.x] = obj is not None
+        if obj is None:
+            self.towers.pop(position, None)
+        else:
+            self.towers[position] = obj
+        self.on_change(position)
+
+    def set_routes(self, routes):
+        """Set the ways across the board (a list of Routes), eg for a map with many lanes.
+        Reset to the default route (get_default_route) by initialize_board."""
+        self.routes = list(routes)
+        self.on_change(None)
+
+    def get_default_route(self):
+        """From the left, column -1 (just off the board), to the right-most column."""
+        return Route(tuple(Vector2(-1, y) for y in range(self.size.y)),
+                     tuple(Vector2(self.size.x - 1, y) for y in range(self.size.y)))
+
+    def get_entries(self):
+        """Every route's entry cells, without repeats."""
+        return list(dict.fromkeys(cell for route in self.routes for cell in route.entries))
+
+    def get_exits(self):
+        """Every route's exit cells, without repeats."""
+        return list(dict.fromkeys(cell for route in self.routes for cell in route.exits))
+
+    def get_landing_cells(self, entry):
+        """Board cells an enemy steps on to from the entry: the entry itself if it's on the
+        board, otherwise the board cells next to it."""
+        if self.is_on_board(entry):
+            return [entry]
+        return [cell for cell in (Vector2(entry.x + dx, entry.y + dy) for dx, dy in DIRECTIONS)
+                if self.is_on_board(cell)]
 
     def get_cell_contents(self, position):
         """What's there?"""
         return self.items[position.y][position.x]
 
+    def get_region(self, position, size):
+        """Occupancy of the size cells from position (top left), as a view indexed [y, x].
+        Clipped to the board."""
+        return self.occupancy[max(position.y, 0):max(position.y + size.y, 0),
+                              max(position.x, 0):max(position.x + size.x, 0)]
+
+    def count_occupied(self):
+        """How many cells have something in them?"""
+        return int(np.count_nonzero(self.occupancy))
+
+    def get_free_cells(self):
+        """Empty cells as an (n, 2) array of x, y."""
+        return np.argwhere(self.occupancy == 0)[:, ::-1]
+
+    def get_occupied_cells(self):
+        """Cells with something in them as an (n, 2) array of x, y."""
+        return np.argwhere(self.occupancy)[:, ::-1]
+
+    def get_free_bytes(self):
+        """Bytes of 1 (free) or 0 (occupied) for every cell, indexed y * size.x + x.
+        Indexing bytes is much quicker than indexing the array one cell at a time."""
+        return (self.occupancy == 0).tobytes()
+
     def is_on_board(self, cell):
         """Is the cell a valid cell?
         is it on the board?"""
@@ -49,61 +167,302 @@ class Board(UIElement):
 
     def mouse_motion_listener(self, event):
         """When there's a mouse motion event, set the mouse cell.
-        If the mouse isn't over a cell, set to None."""
-        board_rect = self.get_scaled_board_rect()
-        mouse_pos = Vector2(event.pos[0], event.pos[1])
-        mouse_pos -= board_rect.get_top_left()
-        mouse_pos /= (board_rect.w / self.size.x)
-        if 0 < mouse_pos.x < self.size.x and 0 < mouse_pos.y < self.size.y:
+        If the mouse isn't over a cell, set to None.
+        Dragging with the middle button pans the camera."""
+        self.mouse_position = event.pos
+        if event.buttons[1]:
+            cell_size = self.get_scaled_board_rect().w / self.size.x
+            self.camera.pan(Vector2(-event.rel[0], -event.rel[1]) / cell_size, self.size)
+        mouse_pos = self.get_board_position(event.pos)
+        if self.get_viewport_rect().collidepoint(event.pos) and \
+                0 < mouse_pos.x < self.size.x and 0 < mouse_pos.y < self.size.y:
             self.mouse_cell = Vector2(int(mouse_pos.x), int(mouse_pos.y))
         else:
             self.mouse_cell = None
 
+    def mouse_wheel_listener(self, event):
+        """Zoom the camera in or out on the point under the mouse.
+        Uses the position from the last mouse motion event rather than asking pygame, so
+        it's the same when the events are replayed."""
+        mouse = self.mouse_position
+        if self.get_viewport_rect().collidepoint(mouse):
+            self.camera.zoom_at(self.zoom_step ** event.y, self.get_board_position(mouse),
+                                self.size)
+
+    def key_down_listener(self, event):
+        """Home shows the whole board again."""
+        # pylint: disable=no-member
+        if event.key == pygame.K_HOME:
+            self.camera.reset()
+
+    def get_board_position(self, pixel):
+        """Where the pixel ((x, y) on the display) is on the board, in cells (not rounded)."""
+        board_rect = self.get_scaled_board_rect()
+        position = Vector2(pixel[0], pixel[1]) - board_rect.get_top_left()
+        return position / (board_rect.w / self.size.x)
+
     # ==================================================
     # Display-ers
     # ==================================================
 
     def show(self):
-        """Show the board. Including the background and towers/tiles"""
-        self.show_background()
+        """Show the board. Including the background, grid, towers and mouse over cell."""
+        self.show_layer()
         self.show_mouse_over_cell()
-        self.show_grid(color=(150, 150, 150))
-        # self.show_towers()
 
-    def show_towers(self):
-        """Loop through all the items and show the towers."""
-        for row in self.items:
-            for item in row:
+    def show_layer(self):
+        """Show the cached layer of background, grid and towers - the chunks in view.
+        Chunks are drawn first if they haven't been yet or the cells have changed size.
+        Returns the pygame.Rect shown."""
+        board_rect = self.get_scaled_board_rect()
+        self._layer_rect = board_rect.get_pygame_tuple()
+        cell_size = board_rect.w / self.size.x
+        if cell_size != self._chunk_cell_size:
+            self._chunks.clear()
+            self._chunk_cell_size = cell_size
+        self.render_changed_cells()
+
+        viewport = self.get_viewport_rect()
+        previous_clip = Display.surface.get_clip()
+        Display.surface.set_clip(viewport)
+        visible_chunks = self.get_visible_chunks(viewport)
+        self._visible_chunks = set(visible_chunks)
+        for chunk in visible_chunks:
+            chunk_left, chunk_top = self.get_chunk_origin(chunk)
+            Display.surface.blit(self.get_chunk(chunk), (self._layer_rect[0] + chunk_left,
+                                                         self._layer_rect[1] + chunk_top))
+        Display.surface.set_clip(previous_clip)
+        return viewport
+
+    def show_layer_changes(self):
+        """Redraw the cells that have changed since the layer was last shown, and show them.
+        Returns the pygame.Rects shown."""
+        rects = []
+        viewport = self.get_viewport_rect()
+        for chunk, area in self.render_changed_cells():
+            if chunk not in self._visible_chunks:
+                continue
+            chunk_left, chunk_top = self.get_chunk_origin(chunk)
+            position = (self._layer_rect[0] + chunk_left + area.x,
+                        self._layer_rect[1] + chunk_top + area.y)
+            shown = pygame.Rect(position, area.size).clip(viewport)
+            if shown.size != (0, 0):
+                area = area.move(shown.x - position[0], shown.y - position[1])
+                area.size = shown.size
+                rects.append(Display.surface.blit(self._chunks[chunk], shown.topleft, area))
+        return rects
+
+    def render_changed_cells(self):
+        """Redraw the cells that have changed in the chunks they overlap. Chunks in view
+        that have been dropped from the cache are drawn again, others are drawn with the
+        changes when they're next shown.
+        Returns (chunk, pygame.Rect of the chunk drawn over) for each part of a cell redrawn."""
+        drawn = []
+        for cell in self._changed_cells if self._chunks else ():
+            for chunk in self.get_cell_chunks(cell):
+                if chunk in self._chunks or chunk in self._visible_chunks:
+                    self.get_chunk(chunk)
+                    drawn.append((chunk, self.render_layer_cell(cell, chunk)))
+        self._changed_cells = []
+        return drawn
+
+    def is_layer_stale(self):
+        """Does the whole layer need to be shown again (eg the camera has moved)?"""
+        return self._layer_rect != self.get_scaled_board_rect().get_pygame_tuple()
+
+    def get_visible_chunks(self, viewport):
+        """The chunks (chunk x, chunk y) overlapping the viewport (pygame.Rect)."""
+        return self.get_chunks_in(viewport[0] - self._layer_rect[0],
+                                  viewport[1] - self._layer_rect[1],
+                                  viewport[2], viewport[3])
+
+    def get_cell_chunks(self, cell, line_width=1):
+        """The chunks the cell (and the grid lines around it) overlaps. Has a pixel to spare
+        on each side, as the chunks round the cell's edges from their own origin."""
+        cell_size = self._chunk_cell_size
+        left = int(cell.x * cell_size) - 1
+        top = int(cell.y * cell_size) - 1
+        return self.get_chunks_in(left, top,
+                                  int((cell.x + 1) * cell_size) - left + line_width + 1,
+                                  int((cell.y + 1) * cell_size) - top + line_width + 1)
+
+    def get_chunks_in(self, x, y, w, h):
+        """The chunks overlapping the area (pixels from the board's top left)."""
+        size = self.chunk_pixels
+        first_x = max(x // size, 0)
+        first_y = max(y // size, 0)
+        end_x = min(-(-(x + w) // size), -(-self._layer_rect[2] // size))
+        end_y = min(-(-(y + h) // size), -(-self._layer_rect[3] // size))
+        return [(chunk_x, chunk_y) for chunk_y in range(first_y, end_y)
+                for chunk_x in range(first_x, end_x)]
+
+    def get_chunk_origin(self, chunk):
+        """Pixel offset of the chunk's top left from the board's top left."""
+        return chunk[0] * self.chunk_pixels, chunk[1] * self.chunk_pixels
+
+    def get_chunk(self, chunk):
+        """The chunk's surface, drawn now if it isn't cached."""
+        surface = self._chunks.get(chunk)
+        if surface is None:
+            surface = self.render_chunk(chunk)
+            self._chunks[chunk] = surface
+            self.drop_chunks()
+        else:
+            self._chunks.move_to_end(chunk)
+        return surface
+
+    def drop_chunks(self):
+        """Drop the least recently shown chunks not in view until there are at most
+        max_chunks (or only chunks in view) left."""
+        excess = len(self._chunks) - self.max_chunks
+        if excess <= 0:
+            return
+        for chunk in [chunk for chunk in self._chunks if chunk not in self._visible_chunks]:
+            del self._chunks[chunk]
+            excess -= 1
+            if not excess:
+                return
+
+    def render_chunk(self, chunk):
+        """Draw the background, grid and towers of the chunk's part of the board onto a new
+        surface."""
+        cell_size = self._chunk_cell_size
+        left, top = self.get_chunk_origin(chunk)
+        width = min(self.chunk_pixels, self._layer_rect[2] - left)
+        height = min(self.chunk_pixels, self._layer_rect[3] - top)
+        surface = pygame.Surface((max(width, 1), max(height, 1)))
+        layer_rect = self.get_chunk_layer_rect(chunk)
+        # The cells overlapping the chunk, and for the towers, the cells around them (a
+        # tower can reach over the grid lines into the next cell)
+        first = (int(left // cell_size), int(top // cell_size))
+        last = (min(math.ceil((left + width) / cell_size), self.size.x),
+                min(math.ceil((top + height) / cell_size), self.size.y))
+        surface.fill(self.background_color)
+        self.show_grid(self.grid_color, 1, surface, layer_rect, (first, last))
+        self.show_towers(surface, layer_rect,
+                         ((max(first[0] - 1, 0), max(first[1] - 1, 0)),
+                          (min(last[0] + 1, self.size.x), min(last[1] + 1, self.size.y))))
+        return surface
+
+    def get_chunk_layer_rect(self, chunk):
+        """The rect of the whole board, placed so the chunk's top left is at (0, 0)."""
+        left, top = self.get_chunk_origin(chunk)
+        board_width = self.size.x * self._chunk_cell_size
+        board_height = self.size.y * self._chunk_cell_size
+        return Rect(board_width / 2 - left, board_height / 2 - top, board_width, board_height)
+
+    def render_layer_cell(self, cell, chunk, line_width=1):
+        """Redraw one cell (and the grid lines around it) in one of the chunks it overlaps.
+        Returns the pygame.Rect of the chunk that was drawn over."""
+        surface = self._chunks[chunk]
+        # Positions worked out just as render_chunk does, so they round the same way
+        offset = self.get_chunk_layer_rect(chunk).get_top_left()
+        cell_size = self._chunk_cell_size
+        left = cell.x * cell_size + offset.x
+        top = cell.y * cell_size + offset.y
+        right = (cell.x + 1) * cell_size + offset.x
+        bottom = (cell.y + 1) * cell_size + offset.y
+        area = pygame.Rect(int(left), int(top), int(right) - int(left) + line_width,
+                           int(bottom) - int(top) + line_width)
+        area = area.clip(surface.get_rect())
+
+        # Drawn in the same order as render_chunk, and towers in the cells around can reach
+        # over the grid lines, so draw those again too
+        surface.set_clip(area)
+        surface.fill(self.background_color, area)
+        for start, end in (((left, top), (left, bottom)), ((right, top), (right, bottom)),
+                           ((left, top), (right, top)), ((left, bottom), (right, bottom))):
+            pygame.draw.line(surface, self.grid_color, start, end, line_width)
+        for y in range(max(cell.y - 1, 0), min(cell.y + 2, self.size.y)):
+            for x in range(max(cell.x - 1, 0), min(cell.x + 2, self.size.x)):
+                item = self.items[y][x]
                 if item:
-                    item.show()
+                    center = offset + (Vector2(x, y) + Vector2.one() / 2) * cell_size
+                    item.show(Rect(center.x, center.y, cell_size, cell_size), surface)
+        surface.set_clip(None)
+        return area
+
+    def layer_cell_changed(self, position):
+        """Board change listener. Remember the cell to redraw it in the layer, if any of
+        the layer has been drawn (so a board that's never shown keeps nothing)."""
+        if position is None:
+            self._chunks.clear()
+            self._visible_chunks = ()
+            self._changed_cells = []
+            self._layer_rect = None
+        elif self._chunks:
+            self._changed_cells.append(position)
 
-    def show_grid(self, color=(0, 0, 0), line_width=1):
-        """Show grid lines over the board."""
-        rect = self.get_scaled_board_rect()
+    def show_towers(self, surface=None, rect=None, region=None):
+        """Show the towers in the occupied cells.
+        Drawn on surface (default Display.surface) with the board taking up rect (default the
+        scaled board rect). region ((x, y) of the first cell, (x, y) past the last cell)
+        limits it to the towers in those cells."""
+        if surface is None:
+            surface = Display.surface
+        if rect is None:
+            rect = self.get_scaled_board_rect()
         offset = rect.get_top_left()
         cell_size = rect.w / self.size.x
-        for x in range(self.size.x + 1):
-            pygame.draw.line(Display.surface, color,
-                             (x * cell_size + offset.x, offset.y),
-                             (x * cell_size + offset.x, rect.h + offset.y),
+        if region is None:
+            towers = self.towers.items()
+        else:
+            (first_x, first_y), (last_x, last_y) = region
+            cells = np.argwhere(self.occupancy[first_y:last_y, first_x:last_x])
+            towers = [(cell, self.towers[cell]) for cell in
+                      (Vector2(int(x) + first_x, int(y) + first_y) for y, x in cells)]
+        for cell, tower in towers:
+            center = offset + (cell + Vector2.one() / 2) * cell_size
+            tower.show(Rect(center.x, center.y, cell_size, cell_size), surface)
+
+    def show_grid(self, color=(0, 0, 0), line_width=1, surface=None, rect=None, region=None):
+        """Show grid lines over the board.
+        Drawn on surface (default Display.surface) with the board taking up rect (default the
+        scaled board rect). region ((x, y) of the first cell, (x, y) past the last cell)
+        limits it to the lines around those cells."""
+        if surface is None:
+            surface = Display.surface
+        if rect is None:
+            rect = self.get_scaled_board_rect()
+        offset = rect.get_top_left()
+        cell_size = rect.w / self.size.x
+        (first_x, first_y), (last_x, last_y) = region or ((0, 0), (self.size.x, self.size.y))
+        for x in range(first_x, last_x + 1):
+            pygame.draw.line(surface, color,
+                             (x * cell_size + offset.x, first_y * cell_size + offset.y),
+                             (x * cell_size + offset.x, last_y * cell_size + offset.y),
                              line_width)
-        for y in range(self.size.y + 1):
-            pygame.draw.line(Display.surface, color,
-                             (offset.x, y * cell_size + offset.y),
-                             (offset.x + rect.w, y * cell_size + offset.y),
+        for y in range(first_y, last_y + 1):
+            pygame.draw.line(surface, color,
+                             (first_x * cell_size + offset.x, y * cell_size + offset.y),
+                             (last_x * cell_size + offset.x, y * cell_size + offset.y),
                              line_width)
 
-    def show_background(self, color=(200, 200, 200)):
+    def show_background(self, color=(200, 200, 200), surface=None, rect=None):
         """Show a solid color backdrop for the board"""
-        pygame.draw.rect(Display.surface, color, self.get_scaled_board_rect().get_pygame_tuple())
+        if surface is None:
+            surface = Display.surface
+        if rect is None:
+            rect = self.get_scaled_board_rect()
+        pygame.draw.rect(surface, color, rect.get_pygame_tuple())
 
-    def show_mouse_over_cell(self, color=(255, 255, 0)):
-        """Highlight the mouse_over cell (if it exists)."""
+    def show_mouse_over_cell(self, color=(255, 255, 0), blocked_color=(255, 80, 80)):
+        """Highlight the mouse_over cell (if it exists), with any tower there shown on top.
+        Uses blocked_color if a tower there would block the path.
+        Returns the pygame.Rect drawn, or None."""
         if self.mouse_cell:
-            pygame.draw.rect(Display.surface,
-                             color,
-                             self.get_cell_rect(self.mouse_cell,
-                                                self.get_final_rect()).get_pygame_tuple())
+            cell_rect = self.get_cell_rect(self.mouse_cell, self.get_final_rect())
+            previous_clip = Display.surface.get_clip()
+            Display.surface.set_clip(self.get_viewport_rect())
+            drawn = pygame.draw.rect(Display.surface,
+                                     blocked_color if self.mouse_cell_blocked else color,
+                                     cell_rect.get_pygame_tuple())
+            item = self.get_cell_contents(self.mouse_cell)
+            if item:
+                item.show(cell_rect)
+            Display.surface.set_clip(previous_clip)
+            return drawn
+        return None
 
     # ==================================================
     # Display helpers
@@ -111,11 +470,27 @@ class Board(UIElement):
 
     def get_scaled_board_rect(self):
         """What is the rect of the board in pixels? - Where will it be shown?
-        Returns a sub-rect of (UIElement.)rect. Maximises the board while keeping the aspect
-        ratio."""
+        With the camera showing the whole board, a sub-rect of (UIElement.)rect that maximises
+        the board while keeping the aspect ratio. Zoomed in, the board is bigger than that
+        and only the part in get_viewport_rect is shown.
+        Cached with the final rect, so don't modify the returned rect."""
         max_rect = self.get_final_rect()
-        scale = min(max_rect.w / self.size.x, max_rect.h / self.size.y)
-        return Rect(max_rect.x, max_rect.y, scale * self.size.x, scale * self.size.y)
+        source = (max_rect, self.size, self.camera.version)
+        if self._board_rect_source is None or self._board_rect_source[0] is not max_rect or \
+                self._board_rect_source[1:] != source[1:]:
+            scale = min(max_rect.w / self.size.x, max_rect.h / self.size.y) * self.camera.zoom
+            center = self.camera.get_center(self.size)
+            self._board_rect = Rect(max_rect.x + (self.size.x / 2 - center.x) * scale,
+                                    max_rect.y + (self.size.y / 2 - center.y) * scale,
+                                    scale * self.size.x, scale * self.size.y)
+            self._board_rect_source = source
+        return self._board_rect
+
+    def get_viewport_rect(self):
+        """The pygame.Rect of the display the board is shown in - where the board and
+        (UIElement.)rect overlap."""
+        return pygame.Rect(self.get_scaled_board_rect().get_pygame_tuple()).clip(
+            self.get_final_rect().get_pygame_tuple())
 
     def get_cell_center(self, cell):
         """Get the center position of the cell in pixels."""
@@ -126,8 +501,7 @@ class Board(UIElement):
 
     def get_cell_size(self):
         """Get the board cell size in pixels."""
-        rect = self.get_scaled_board_rect()
-        return min(rect.x / self.size.x, rect.y / self.size.y) * 2
+        return self.get_scaled_board_rect().w / self.size.x
 
     def get_cell_rect(self, position, display_rect):
         """Get the rect of the cell in pixels."""
@@ -0,0 +1,208 @@
+from collections import deque
+
+from flow_field import compute_field, UNREACHABLE
+
+ENTRY = -1  # Virtual cell joined to the cells a route's entries step on to
+EXIT = -2  # Virtual cell joined to a route's exit cells
+
+
+class ConnectivityIndex:
+    """ Which free cells, if occupied, would cut any route's entries off from its exits?
+
+    A cell can only cut a route if every way across goes through it, so it must be on any
+    one path across. The index keeps a path across each of the board's routes, and the
+    cells off every path are answered with a lookup. For a cell on a path, two breadth
+    first searches that avoid the cell are run a step at a time each. One starts from the
+    cell before it on the path and one from the cell after. If they meet, the route can go
+    around the cell. If one runs out of cells first, the cell cuts the route. So a search
+    only covers the area up to the way around, or the smaller side of the cut. Answers are
+    kept until the board changes.
+
+    The paths are kept up to date as the board changes, rather than searched for again.
+    Occupying a cell on a path splices the way around it in (from the same searches).
+    Freeing a cell leaves the paths as they are, as they're still clear. The only exception
+    is a route with no path, which is searched again. The whole index is only rebuilt
+    when the whole board changes (eg the routes are set).
+
+    Cells are flat indices, y * board.size.x + x.
+
+    Typical usage:
+
+        connectivity = ConnectivityIndex(board)  # Listens to the board for changes
+        if not connectivity.would_block(cell):
+            ...
+    """
+
+    board = None
+    landing_cells = None  # For each of board.routes, the cells its entries step on to
+    exit_cells = None  # For each of board.routes, its exit cells
+    paths = None  # For each of board.routes, the cells of a path across, None if there's none
+    path_indices = None  # For each of board.routes, path cell -> its index in the path
+    answers = None  # cell -> would_block, for the cells asked about since the board changed
+    dirty = True
+
+    def __init__(self, board):
+        self.board = board
+        self.answers = {}
+        board.add_change_listener(self.board_changed)
+
+    @property
+    def connected(self):
+        """ Can every route's exits be reached from its entries at all? """
+        self.update()
+        return all(path is not None for path in self.paths)
+
+    def board_changed(self, position):
+        """ Board change listener. Repair the paths through the cell, or mark the index to be
+        rebuilt if the whole board changed. """
+        self.answers = {}
+        if position is None or self.dirty:
+            self.dirty = True
+            return
+        cell = position.y * self.board.size.x + position.x
+        freed = self.board.items[position.y][position.x] is None
+        for route, indices in enumerate(self.path_indices):
+            if indices is None:
+                if freed:
+                    self.find_route_path(route)
+            elif not freed and cell in indices:
+                self.set_path(route, self.find_way_around(route, indices[cell]))
+
+    def update(self):
+        """ Rebuild the index if the whole board has changed since it was last built. """
+        if self.dirty:
+            self.build()
+
+    def would_block(self, cell):
+        """ Would occupying the cell leave no path from the entry to the exit?
+        Always True if there is no path already. False for cells that are already occupied,
+        as occupying them again changes nothing. """
+        self.update()
+        if not self.connected:
+            return True
+        key = cell.y * self.board.size.x + cell.x
+        answer = self.answers.get(key)
+        if answer is None:
+            answer = any(key in indices and self.find_way_around(route, indices[key]) is None
+                         for route, indices in enumerate(self.path_indices))
+            self.answers[key] = answer
+        return answer
+
+    def build(self):
+        """ Find a path across each of the board's routes. """
+        width = self.board.size.x
+        self.landing_cells = []
+        self.exit_cells = []
+        self.paths = []
+        self.path_indices = []
+        for route in self.board.routes:
+            self.landing_cells.append({cell.y * width + cell.x for entry in route.entries
+                                       for cell in self.board.get_landing_cells(entry)})
+            self.exit_cells.append({cell.y * width + cell.x for cell in route.exits})
+            self.paths.append(None)
+            self.path_indices.append(None)
+            self.find_route_path(len(self.paths) - 1)
+        self.answers = {}
+        self.dirty = False
+
+    def find_route_path(self, route):
+        """ Search for a path across the route (an index into board.routes) from scratch:
+        a breadth first search back from its exits, then down the distances from the
+        closest cell its entries step on to. """
+        distances, next_cells = compute_field(self.board, self.board.routes[route].exits)
+        reachable = [cell for cell in self.landing_cells[route]
+                     if distances[cell] != UNREACHABLE]
+        path = [ENTRY]
+        cell = min(reachable, key=lambda landing: distances[landing]) if reachable else None
+        while cell is not None and cell != UNREACHABLE:
+            path.append(cell)
+            cell = int(next_cells[cell])
+        self.set_path(route, path + [EXIT])
+
+    def set_path(self, route, path):
+        """ Keep path (cells from ENTRY to EXIT, which can go through them on the way and
+        repeat cells) as the route's path, or that there's no path if it's None. Cuts the
+        path down to its last ENTRY to the first EXIT after, without loops. """
+        if path is None or len(path) < 3:
+            self.paths[route] = self.path_indices[route] = None
+            return
+        path = path[:path.index(EXIT)]
+        path = path[len(path) - path[::-1].index(ENTRY):]
+        cells = []
+        indices = {}
+        for cell in path:
+            if cell in indices:
+                for loop_cell in cells[indices[cell] + 1:]:
+                    del indices[loop_cell]
+                del cells[indices[cell] + 1:]
+            else:
+                indices[cell] = len(cells)
+                cells.append(cell)
+        self.paths[route] = cells
+        self.path_indices[route] = indices
+
+    def find_way_around(self, route, index):
+        """ Search for a way around the index'th cell of the route's path. Searches from the
+        cells before and after it on the path (or ENTRY and EXIT at its ends), a step from
+        each at a time, until they meet or one runs out of cells.
+        Returns the route's path with the way around in place of the cell (see set_path),
+        or None if there's no way around. """
+        path = self.paths[route]
+        avoid = path[index]
+        starts = (path[index - 1] if index > 0 else ENTRY,
+                  path[index + 1] if index + 1 < len(path) else EXIT)
+        parents = ({starts[0]: None}, {starts[1]: None})
+        queues = (deque((starts[0],)), deque((starts[1],)))
+        side = 0
+        while queues[side]:
+            node = queues[side].popleft()
+            for neighbour in self.get_neighbours(route, node):
+                if neighbour == avoid or neighbour in parents[side]:
+                    continue
+                if neighbour in parents[1 - side]:
+                    ends = (node, neighbour) if side == 0 else (neighbour, node)
+                    way = self._get_chain(parents[0], ends[0])[::-1] + \
+                        self._get_chain(parents[1], ends[1])
+                    return [ENTRY] + path[:max(index - 1, 0)] + way + path[index + 2:] + [EXIT]
+                parents[side][neighbour] = node
+                queues[side].append(neighbour)
+            side = 1 - side
+        return None
+
+    @staticmethod
+    def _get_chain(parents, node):
+        """ The cells from node back to the start of its search. """
+        chain = []
+        while node is not None:
+            chain.append(node)
+            node = parents[node]
+        return chain
+
+    def get_neighbours(self, route, node):
+        """ Free cells (and ENTRY/EXIT) joined to the node, for the route. """
+        if node == ENTRY:
+            return [cell for cell in self.landing_cells[route] if self._is_free(cell)]
+        if node == EXIT:
+            return [cell for cell in self.exit_cells[route] if self._is_free(cell)]
+        width = self.board.size.x
+        y, x = divmod(node, width)
+        items = self.board.items
+        neighbours = []
+        if x > 0 and items[y][x - 1] is None:
+            neighbours.append(node - 1)
+        if x < width - 1 and items[y][x + 1] is None:
+            neighbours.append(node + 1)
+        if y > 0 and items[y - 1][x] is None:
+            neighbours.append(node - width)
+        if y < self.board.size.y - 1 and items[y + 1][x] is None:
+            neighbours.append(node + width)
+        if node in self.landing_cells[route]:
+            neighbours.append(ENTRY)
+        if node in self.exit_cells[route]:
+            neighbours.append(EXIT)
+        return neighbours
+
+    def _is_free(self, cell):
+        """ Is nothing in the cell? """
+        y, x = divmod(cell, self.board.size.x)
+        return self.board.items[y][x] is None
@@ -0,0 +1,10 @@
+class Enemy:
+    """ A kind of enemy.
+
+    Live enemies are rows in EnemyManager's arrays rather than objects, so an enemy class
+    just describes how its enemies look and how tough and fast they are. """
+
+    color = (200, 0, 0)
+    size = 0.6  # Width in cells
+    speed = 2  # Cells per second
+    health = 10
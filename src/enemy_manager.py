@@ -0,0 +1,265 @@
+import numpy as np
+
+from engine.array_store import ArrayStore
+from engine.clock import Clock
+from engine.display import Display
+from engine.draw import draw_kinds_on_board
+from engine.vector2 import Vector2
+
+from board import DIRECTIONS
+from flow_field import FlowField, UNREACHABLE
+from spatial_index import SpatialIndex
+
+
+class _EnemyManager:
+    """ Class to manage enemies
+
+    Every live enemy is a row in a struct of arrays (see ArrayStore): position in board
+    cells, target (the flat index, y * board.size.x + x, of the cell it's walking to),
+    speed, health, kind (index into kinds, the enemy classes seen so far) and field (index
+    into flow_fields of the flow field it follows).
+
+    Each of the board's routes has a flow field to its own exits, shared by routes with the
+    same exits, and enemies are sent down the routes in turn. Enemies follow their route's
+    flow field rather than one path: each tick every enemy moves towards its target, and
+    the ones that arrive take the flow field's next cell as their new target, all in a few
+    array operations for each flow field. Enemies reaching an exit leave the board
+    (leaked) and ones with no health left die (killed), removed in bulk. Enemies walled in
+    where no exit can be reached leave the board too, counted as leaked, so walling enemies
+    in can't hold a wave up forever.
+    After moving, the enemies are bucketed in a SpatialIndex for range queries.
+
+    Typical usage:
+
+        EnemyManager.start(board)
+        EnemyManager.spawn(Enemy, 10)
+        EnemyManager.update()  # Every tick
+    """
+
+    kinds = None
+    store = None
+    board = None
+    flow_fields = None  # FlowField to each different set of route exits
+    route_fields = None  # Index into flow_fields for each of board.routes
+    _field_indices = None  # Exits -> index into flow_fields
+    _next_route = 0  # Index into board.routes of the route the next enemy is sent down
+    index = None  # SpatialIndex of the enemies, rebuilt every update
+    remaining = None  # Distance each enemy has left to go, as of the last update
+    leaked = 0  # How many enemies have reached an exit
+    killed = 0
+
+    def __init__(self):
+        self.kinds = []
+        self.store = ArrayStore({
+            "position": (np.float32, (2,)),
+            "target": (np.int32, ()),
+            "speed": (np.float32, ()),
+            "health": (np.float32, ()),
+            "kind": (np.int16, ()),
+            "field": (np.int16, ()),
+        })
+
+    def start(self, board):
+        """ Send enemies across the board, down its routes. Removes any enemies from
+        before. """
+        self.board = board
+        self.flow_fields = []
+        self._field_indices = {}
+        self._next_route = 0
+        board.add_change_listener(self.board_changed)
+        self.update_routes()
+        self.index = SpatialIndex(board)
+        self.clear()
+
+    def board_changed(self, position):
+        """ Board change listener. The routes may have changed if the whole board did. """
+        if position is None:
+            self.update_routes()
+
+    def update_routes(self):
+        """ Find the flow field for each of the board's routes, making any that are new.
+        Flow fields are never dropped, so the enemies' field indices stay valid. """
+        self.route_fields = []
+        for route in self.board.routes:
+            if route.exits not in self._field_indices:
+                self._field_indices[route.exits] = len(self.flow_fields)
+                self.flow_fields.append(FlowField(self.board, route.exits))
+            self.route_fields.append(self._field_indices[route.exits])
+
+    @property
+    def count(self):
+        """ How many enemies are live? """
+        return self.store.count
+
+    def get_stats(self):
+        """ Live, free and high water counts of the enemies' rows. """
+        return self.store.get_stats()
+
+    def get_entry_cell(self, route):
+        """ The entry of the route (an index into board.routes) with the shortest way to one
+        of its exits, and the board cell it steps on to.
+        Returns (entry, cell), or None if none of its exits can be reached. """
+        flow_field = self.flow_fields[self.route_fields[route]]
+        best = None
+        for entry in self.board.routes[route].entries:
+            cost = 0 if self.board.is_on_board(entry) else 1
+            for cell in self.board.get_landing_cells(entry):
+                distance = flow_field.get_distance(cell)
+                if distance != UNREACHABLE and (best is None or cost + distance < best[0]):
+                    best = (cost + distance, entry, cell)
+        return None if best is None else best[1:]
+
+    def spawn(self, enemy_class, number):
+        """ Put number enemy_class enemies on the board, sent down the routes that can be
+        crossed in turn, each at its entry with the shortest way across.
+        Returns how many were spawned - none if no route can be crossed. """
+        routes = []
+        for route in range(len(self.board.routes)):
+            entry_cell = self.get_entry_cell(route)
+            if entry_cell is not None:
+                routes.append((route, entry_cell))
+        if not routes or number <= 0:
+            return 0
+        if enemy_class not in self.kinds:
+            self.kinds.append(enemy_class)
+        store = self.store
+        rows = store.add(number)
+        turns = (self._next_route + np.arange(number)) % len(routes)
+        self._next_route = (self._next_route + number) % len(routes)
+        for turn, (route, (entry, cell)) in enumerate(routes):
+            route_rows = rows.start + np.flatnonzero(turns == turn)
+            store.position[route_rows] = (entry.x, entry.y)
+            store.target[route_rows] = cell.y * self.board.size.x + cell.x
+            store.field[route_rows] = self.route_fields[route]
+        store.speed[rows] = enemy_class.speed
+        store.health[rows] = enemy_class.health
+        store.kind[rows] = self.kinds.index(enemy_class)
+        return number
+
+    def damage(self, enemies, amount):
+        """ Take amount of health from each of enemies (a row, or an array of rows which may
+        repeat).
+        Dead enemies are removed on the next update, and can't be targeted until then. """
+        enemies = np.atleast_1d(enemies)
+        np.subtract.at(self.store.health, enemies, amount)
+        self.remaining[enemies[self.store.health[enemies] <= 0]] = np.inf
+
+    def update(self):
+        """ Move every enemy one tick, remove the dead and leaked ones and rebuild the
+        index. """
+        store = self.store
+        count = store.count
+        if count:
+            leaked = self._move(count)
+            dead = store.health[:count] <= 0
+            self.leaked += int(np.count_nonzero(leaked))
+            self.killed += int(np.count_nonzero(dead & ~leaked))
+            store.remove(leaked | dead)
+        if count or len(self.index.order):
+            self.index.build(store.position[:store.count])
+            self.remaining = self.get_remaining()
+
+    def _move(self, count):
+        """ Step the enemies towards their targets, retargeting the ones that get there.
+        Returns a mask of the enemies that reached an exit or were walled in. """
+        store = self.store
+        width = self.board.size.x
+        positions = store.position[:count]
+        targets = store.target[:count]
+        target_positions = np.empty((count, 2), dtype=np.float32)
+        target_positions[:, 0] = targets % width
+        target_positions[:, 1] = targets // width
+
+        offsets = target_positions - positions
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        steps = store.speed[:count] * Clock.dt
+        arrived = distances <= steps
+        moving = ~arrived
+        positions[moving] += offsets[moving] * (steps[moving] / distances[moving])[:, None]
+        positions[arrived] = target_positions[arrived]
+
+        leaked = np.zeros(count, dtype=bool)
+        arrivals = np.flatnonzero(arrived)
+        fields = store.field[arrivals]
+        for field in np.unique(fields):
+            flow_field = self.flow_fields[field]
+            flow_field.update()
+            field_arrivals = arrivals[fields == field]
+            cells = targets[field_arrivals]
+            next_cells = flow_field.next_cells[cells]
+            at_exit = flow_field.distances[cells] == 0
+            # Built over since the enemy set off - find another way
+            stuck = np.flatnonzero((next_cells == UNREACHABLE) & ~at_exit)
+            if stuck.size:
+                way_out = self._get_way_out(cells[stuck], flow_field.distances)
+                next_cells[stuck] = way_out
+                # Walled in - there's no way out
+                at_exit[stuck[way_out == cells[stuck]]] = True
+            targets[field_arrivals] = next_cells
+            leaked[field_arrivals[at_exit]] = True
+        return leaked
+
+    def _get_way_out(self, cells, distances):
+        """ For each of cells, the neighbour closest to an exit (by distances, a flow field's
+        distances), or the cell itself if it's boxed in. """
+        width = self.board.size.x
+        height = self.board.size.y
+        x = cells % width
+        y = cells // width
+        best = cells.copy()
+        best_distances = np.full(cells.size, np.iinfo(np.int32).max)
+        for dx, dy in DIRECTIONS:
+            on_board = (x + dx >= 0) & (x + dx < width) & (y + dy >= 0) & (y + dy < height)
+            neighbours = np.where(on_board, cells + dy * width + dx, cells)
+            neighbour_distances = distances[neighbours]
+            better = on_board & (neighbour_distances != UNREACHABLE) & \
+                (neighbour_distances < best_distances)
+            best[better] = neighbours[better]
+            best_distances[better] = neighbour_distances[better]
+        return best
+
+    def get_target(self, cell, radius):
+        """ The live enemy within radius cells of cell (Vector2) that is furthest along the
+        path, as of the last update. Returns its row, or None if there are none in range. """
+        if not self.store.count:
+            return None
+        return self.index.query_first(cell, radius, self.remaining)
+
+    def get_position(self, enemy):
+        """ Where the enemy (a row) is, in board cells. """
+        x, y = self.store.position[enemy]
+        return Vector2(float(x), float(y))
+
+    def get_remaining(self):
+        """ How far each enemy has left to go to an exit of its route, in cells. """
+        store = self.store
+        count = store.count
+        width = self.board.size.x
+        targets = store.target[:count]
+        fields = store.field[:count]
+        offsets = store.position[:count] - np.stack((targets % width, targets // width), axis=1)
+        remaining = np.hypot(offsets[:, 0], offsets[:, 1])
+        for field in np.unique(fields):
+            flow_field = self.flow_fields[field]
+            flow_field.update()
+            in_field = fields == field
+            remaining[in_field] += flow_field.distances[targets[in_field]]
+        return remaining
+
+    def clear(self):
+        """ Remove every enemy. """
+        self.store.clear()
+        if self.index is not None:
+            self.index.build(self.store.position[:0])
+            self.remaining = np.empty(0)
+
+    def show_enemies(self, board):
+        """ Draw every enemy on the board as a square, one pass per kind.
+        Only those in the board's viewport are drawn.
+        Returns the pygame.Rects drawn over (one bounding rect per kind). """
+        count = self.store.count
+        return draw_kinds_on_board(Display.surface, board, self.store.position[:count],
+                                   self.store.kind[:count], self.kinds)
+
+
+EnemyManager = _EnemyManager()
@@ -0,0 +1,55 @@
+from engine.clock import Clock
+
+from enemy import Enemy
+from enemy_manager import EnemyManager
+
+
+class Wave:
+    """ A group of enemies sent onto the board a batch at a time.
+
+    Batches are spawned by a Clock timer, so a wave comes in at the same simulated rate
+    whatever speed the game runs at.
+
+    Typical usage:
+
+        wave = Wave.get_wave(1)
+        wave.start()
+        ...
+        if not wave.is_spawning() and not EnemyManager.count:
+            # Wave over
+    """
+
+    enemy_class = None
+    count = 0  # How many enemies in the whole wave
+    batch_size = 1  # How many enemies are spawned together
+    interval = 0  # Seconds between batches
+    spawned = 0
+
+    def __init__(self, enemy_class, count, interval=0.5, batch_size=1):
+        self.enemy_class = enemy_class
+        self.count = count
+        self.interval = interval
+        self.batch_size = batch_size
+        self.spawned = 0
+
+    @staticmethod
+    def get_wave(number):
+        """ The wave for the round number (from 1). Each wave is bigger and comes in faster
+        than the last. """
+        return Wave(Enemy, 10 * number, batch_size=number)
+
+    def start(self):
+        """ Spawn the first batch now and the rest as the timer comes due. """
+        self.spawn_batch()
+
+    def is_spawning(self):
+        """ Are there still enemies to come? """
+        return self.spawned < self.count
+
+    def spawn_batch(self):
+        """ Spawn the next batch and schedule the one after. """
+        number = min(self.batch_size, self.count - self.spawned)
+        EnemyManager.spawn(self.enemy_class, number)
+        self.spawned += number
+        if self.is_spawning():
+            Clock.schedule(self.interval, self.spawn_batch)
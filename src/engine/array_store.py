@@ -0,0 +1,80 @@
+"""Contains the ArrayStore class
+
+    Typical usage:
+
+    store = ArrayStore({"position": (np.float32, (2,)), "health": (np.int32, ())})
+    rows = store.add(10)
+    store.position[rows] = ...
+    store.remove(store.health[:store.count] <= 0)
+"""
+import numpy as np
+
+
+class ArrayStore:
+    """Struct of arrays holding a variable number of rows, eg one row per projectile.
+
+    Each field is a NumPy array attribute of the store with one row per item. Rows
+    0 to count - 1 are live; the rest is spare capacity, which doubles when it runs out.
+    Removing rows moves live rows from the end into the gaps (swap-remove), so the live rows
+    stay contiguous and nothing else is moved. Row numbers are therefore only stable until
+    the next remove.
+
+    Attributes:
+        fields: field name -> (dtype, shape of each row)
+        count: number of live rows
+        high_water: the most live rows there have been at once
+    """
+
+    fields = None
+    count = 0
+    high_water = 0
+    capacity = 0
+
+    def __init__(self, fields, capacity=64):
+        self.fields = fields
+        self.count = 0
+        self.high_water = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Resize every field to capacity rows, keeping the live rows."""
+        for name, (dtype, shape) in self.fields.items():
+            array = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+            if self.capacity:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def add(self, number=1):
+        """Make number new rows at the end. Returns the slice of the new rows to fill in."""
+        start = self.count
+        if start + number > self.capacity:
+            capacity = self.capacity
+            while start + number > capacity:
+                capacity *= 2
+            self._allocate(capacity)
+        self.count += number
+        self.high_water = max(self.high_water, self.count)
+        return slice(start, self.count)
+
+    def remove(self, mask):
+        """Remove the live rows where mask (a bool array of count rows) is True."""
+        dead = np.flatnonzero(mask)
+        if not dead.size:
+            return
+        new_count = self.count - dead.size
+        holes = dead[dead < new_count]
+        movers = np.flatnonzero(~mask[new_count:]) + new_count
+        for name in self.fields:
+            array = getattr(self, name)
+            array[holes] = array[movers]
+        self.count = new_count
+
+    def clear(self):
+        """Remove every row."""
+        self.count = 0
+
+    def get_stats(self):
+        """Live, free (spare capacity) and high water row counts."""
+        return {"live": self.count, "free": self.capacity - self.count,
+                "high_water": self.high_water}
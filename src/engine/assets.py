@@ -0,0 +1,69 @@
+"""Contains the Assets cache
+
+    Typical usage:
+
+    surface.blit(Assets.get_scaled("images/TestTower.png", (64, 64)), (x, y))
+"""
+from collections import OrderedDict
+
+import pygame
+
+from engine.display import Display
+
+
+class _Assets:
+    """Images loaded from disk once and shared.
+
+    Each image is loaded the first time its path is asked for and converted to the display's
+    pixel format, so blitting it needs no conversion (not in headless mode, which has no
+    display format). Scaled copies are kept in a least recently used cache keyed by path and
+    size, so an image drawn at the same size every frame is only scaled once. The scaled
+    copies are thrown away when the display is resized, as everything is drawn at new sizes.
+
+    Attributes:
+        max_scaled: how many scaled copies to keep.
+    """
+
+    max_scaled = 256
+
+    _images = None  # path -> pygame.Surface
+    _scaled = None  # (path, (w, h)) -> pygame.Surface, least recently used first
+
+    def __init__(self):
+        self._images = {}
+        self._scaled = OrderedDict()
+
+    def get_image(self, path):
+        """The image at path, at its own size."""
+        image = self._images.get(path)
+        if image is None:
+            image = pygame.image.load(path)
+            if not Display.headless and pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            self._images[path] = image
+        return image
+
+    def get_scaled(self, path, size):
+        """The image at path scaled to size ((w, h) in pixels)."""
+        key = (path, (int(size[0]), int(size[1])))
+        image = self._scaled.get(key)
+        if image is not None:
+            self._scaled.move_to_end(key)
+            return image
+        image = pygame.transform.scale(self.get_image(path), key[1])
+        self._scaled[key] = image
+        if len(self._scaled) > self.max_scaled:
+            self._scaled.popitem(last=False)
+        return image
+
+    def clear_scaled(self):
+        """Throw away the scaled copies, eg when everything is about to be drawn at new sizes."""
+        self._scaled.clear()
+
+    def clear(self):
+        """Throw away everything, so images are loaded again from disk."""
+        self._images.clear()
+        self._scaled.clear()
+
+
+Assets = _Assets()
@@ -11,18 +11,15 @@
         ...
 """
 # pylint: disable=import-error
-import pygame
-
 from engine.ui_element import UIElement, ScaleModes
-from engine.vector2 import Vector2
 from engine.event_handler import EventHandler
 
 
 class Button(UIElement):
     """Button object. UIElement able to show solid rect and detect being clicked.
 
-    Button uses listeners for click detection.
-    To call a function foo on button press,
+    Button gets mouse events from EventHandler.hit_test_index, only while it is the topmost
+    element under the mouse. To call a function foo on button press,
 
         button = Button(...)
         button.add_mouse_up_listener(foo)
@@ -39,38 +36,31 @@ class Button(UIElement):
     hovered_color = (150, 150, 150)
     pressed_color = (170, 255, 170)
 
+    _shown_color = None  # color the button was last shown in
+
     def init(self):
-        # pylint: disable=no-member
-        EventHandler.add_listener(pygame.MOUSEMOTION, self.on_mouse_move)
-        EventHandler.add_listener(pygame.MOUSEBUTTONDOWN, self.on_mouse_down)
-        EventHandler.add_listener(pygame.MOUSEBUTTONUP, self.on_mouse_up)
+        EventHandler.hit_test_index.add(self)
 
         self.mouse_up_listeners = []
         self.mouse_down_listeners = []
 
-    def on_mouse_move(self, event):
-        """Listener for the mouse move event.
+    def on_mouse_enter(self, event):
+        """Listener for the mouse moving on to the button. Set mouse_over to True."""
+        self.mouse_over = True
 
-        On the event, check whether the mouse is over the button.
-        If the mouse is over the button, set the mouse_over attribute to True, else False
-        If mouse_over is set to false, also set mouse_down to False
-        """
-        mouse_pos = Vector2(event.pos[0], event.pos[1])
-        if self._last_display_rect:  # When app first opened, this may not exist
-            self.mouse_over = self._last_display_rect.is_touching(mouse_pos)
-            if not self.mouse_over:
-                self.mouse_down = False
+    def on_mouse_leave(self, event):
+        """Listener for the mouse moving off the button. Set mouse_over and mouse_down to False."""
+        self.mouse_over = False
+        self.mouse_down = False
 
     def on_mouse_down(self, event):
-        """Listener for the mouse down event.
+        """Listener for the mouse down event, sent while the mouse is over the button.
 
-        If the mouse_over attribute is True,
-            the mouse down listeners are called and mouse_down attribute is set to True
+        The mouse down listeners are called and mouse_down attribute is set to True
         """
-        if self.mouse_over:
-            self.mouse_down = True
-            for listener in self.mouse_down_listeners:
-                listener(event)
+        self.mouse_down = True
+        for listener in self.mouse_down_listeners:
+            listener(event)
 
     def on_mouse_up(self, event):
         """Listener for the mouse up event.
@@ -91,10 +81,17 @@ class Button(UIElement):
         """Show the button - currently just the area rect.
         Color depends on whether mouse is over button and whether the mouse is down.
         """
+        self._shown_color = self.get_color()
+        self.show_area(self._shown_color)
+
+    def get_color(self):
+        """What color should the button be right now?"""
         if self.mouse_down:
-            color = self.pressed_color
-        elif self.mouse_over:
-            color = self.hovered_color
-        else:
-            color = self.idle_color
-        self.show_area(color)
+            return self.pressed_color
+        if self.mouse_over:
+            return self.hovered_color
+        return self.idle_color
+
+    def has_changed(self):
+        """Does the button look different to when it was last shown?"""
+        return self.get_color() != self._shown_color
@@ -0,0 +1,65 @@
+"""Contains the Camera class
+
+    Typical usage:
+
+    camera = Camera()
+    camera.zoom_at(2, point, content_size)  # Zoom in on point, keeping it where it is
+    camera.pan(Vector2(1, 0), content_size)  # Move the view right by 1 (content units)
+"""
+from engine.vector2 import Vector2
+
+
+class Camera:
+    """Pan and zoom over some content (eg a board) shown in a viewport.
+
+    The camera doesn't know about pixels: what it shows is described by the point of the
+    content (in content units, eg board cells) at the middle of the viewport and how far it
+    is zoomed in, where a zoom of 1 fits the whole content in the viewport. Whatever draws the
+    content works out the pixels from those.
+
+    Attributes:
+        center: content point at the middle of the viewport. None for the middle of the
+            content.
+        zoom: how many times bigger than fitting the viewport the content is shown.
+        version: bumped on every change, for caches of anything drawn through the camera.
+    """
+
+    min_zoom = 1
+    max_zoom = 64
+
+    center = None
+    zoom = 1
+    version = 0
+
+    def reset(self):
+        """Show all of the content again."""
+        self.center = None
+        self.zoom = 1
+        self.version += 1
+
+    def get_center(self, content_size):
+        """The content point at the middle of the viewport."""
+        if self.center is None:
+            return content_size / 2
+        return self.center
+
+    def pan(self, offset, content_size):
+        """Move the view by offset (Vector2, content units), staying over the content."""
+        self._set_center(self.get_center(content_size) + offset, content_size)
+
+    def zoom_at(self, factor, point, content_size):
+        """Zoom in by factor (out if less than 1), keeping the content point (Vector2) at
+        the same place in the viewport."""
+        zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        factor = zoom / self.zoom
+        self.zoom = zoom
+        center = self.get_center(content_size)
+        self._set_center(point - (point - center) / factor, content_size)
+
+    def _set_center(self, center, content_size):
+        """Move the middle of the view to center, kept far enough inside the content that
+        the view doesn't go past its edges."""
+        margin = content_size / (2 * self.zoom)
+        self.center = Vector2(min(max(center.x, margin.x), content_size.x - margin.x),
+                              min(max(center.y, margin.y), content_size.y - margin.y))
+        self.version += 1
@@ -0,0 +1,84 @@
+"""Contains the simulation Clock.
+
+Game logic should read the time from Clock rather than the wall clock, so it runs the same
+however fast the frames are drawn (or if they aren't drawn at all). Things that happen at a
+set time (expiry, cooldowns, ...) should be scheduled as timers rather than checked every
+tick.
+
+    Typical usage:
+
+    timer = Clock.schedule(duration, on_expire)
+    ...
+    Clock.cancel(timer)  # If it shouldn't happen after all
+"""
+import heapq
+
+
+class Timer:
+    """A callback due at a simulation time. See Clock.schedule."""
+
+    __slots__ = ("time", "callback", "cancelled")
+
+    def __init__(self, time, callback):
+        self.time = time
+        self.callback = callback
+        self.cancelled = False
+
+
+class _Clock:
+    """Simulation time, advanced by a fixed step each tick, and the timers due at it.
+
+    Timers are kept in a heap on (time, order scheduled), so each tick only the timers that
+    are due are looked at, and timers due at the same time run in the order they were
+    scheduled.
+
+    Attributes:
+        dt: seconds of simulation time per tick.
+        tick: how many ticks have been run.
+        time: seconds of simulation time that have passed.
+    """
+
+    dt = 1 / 60
+    tick = 0
+    time = 0.0
+
+    _timers = None
+    _timer_count = 0
+
+    def __init__(self):
+        self._timers = []
+
+    def step(self):
+        """Advance the clock by one tick and run the timers that are now due."""
+        self.tick += 1
+        self.time = self.tick * self.dt
+        timers = self._timers
+        while timers and timers[0][0] <= self.time:
+            timer = heapq.heappop(timers)[2]
+            if not timer.cancelled:
+                timer.callback()
+
+    def schedule(self, delay, callback):
+        """Call callback (with no arguments) delay seconds of simulation time from now.
+        Returns the Timer, to cancel it with."""
+        return self.schedule_at(self.time + delay, callback)
+
+    def schedule_at(self, time, callback):
+        """Call callback (with no arguments) at the simulation time.
+        Returns the Timer, to cancel it with."""
+        timer = Timer(time, callback)
+        self._timer_count += 1
+        heapq.heappush(self._timers, (time, self._timer_count, timer))
+        return timer
+
+    @staticmethod
+    def cancel(timer):
+        """Stop the timer from running. Cancelled timers are dropped when they come due."""
+        timer.cancelled = True
+
+    def pending_timers(self):
+        """How many timers are waiting, including cancelled ones not yet dropped."""
+        return len(self._timers)
+
+
+Clock = _Clock()
@@ -1,18 +1,59 @@
+import os
 import pygame
 from engine.vector2 import Vector2
 
 
 class _Display:
+    """ The game window. Nothing is created until start is called.
+
+    In headless mode there is no window: surface is an offscreen pygame.Surface and the
+    dummy SDL video driver is used so events still work.
+
+    Only the parts of the surface marked dirty are pushed to the window by update. """
 
     surface = None
     size = None
+    headless = False
+
+    dirty_rects = None  # Parts of the surface to push to the window on update
+    full_update = True  # Push the whole surface on update?
 
     def __init__(self):
-        self.resize(Vector2(800, 400))
+        self.size = Vector2(800, 400)
+        self.dirty_rects = []
+
+    def start(self, headless=False):
+        """ Start the video system and open the window (or the offscreen surface if headless). """
+        self.headless = headless
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        pygame.display.init()
+        self.resize(self.size)
 
     def resize(self, new_size):
         self.size = new_size
-        self.surface = pygame.display.set_mode((new_size.x, new_size.y), pygame.RESIZABLE)
+        self.mark_all_dirty()
+        if self.headless:
+            self.surface = pygame.Surface((new_size.x, new_size.y))
+        else:
+            self.surface = pygame.display.set_mode((new_size.x, new_size.y), pygame.RESIZABLE)
+
+    def mark_dirty(self, rects):
+        """ Push the rects (pygame.Rects or (x, y, w, h) tuples) to the window on update. """
+        self.dirty_rects.extend(rects)
+
+    def mark_all_dirty(self):
+        """ Push the whole surface to the window on update. """
+        self.full_update = True
+
+    def update(self):
+        """ Push the dirty parts of the surface to the window. """
+        if self.full_update:
+            pygame.display.update()
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+        self.full_update = False
 
 
 Display = _Display()
@@ -0,0 +1,56 @@
+"""Drawing helpers for many things at once.
+
+    Typical usage:
+
+    rect = draw_squares(Display.surface, centers, half_size, (255, 0, 0))
+    rects = draw_kinds_on_board(Display.surface, board, positions, kinds, classes)
+"""
+import numpy as np
+import pygame
+
+
+def draw_squares(surface, centers, half_size, color, clip=None):
+    """Fill a square of side 2 * half_size pixels around each of centers, a (n, 2) int
+    array of pixel positions, in one pass over the surface's pixels. Squares that would go
+    off the surface, or outside clip (pygame.Rect) if given, are skipped.
+    Returns the pygame.Rect bounding the squares drawn, or None if nothing was drawn."""
+    left, top, right, bottom = 0, 0, *surface.get_size()
+    if clip is not None:
+        left, top = max(clip[0], 0), max(clip[1], 0)
+        right, bottom = min(clip[0] + clip[2], right), min(clip[1] + clip[3], bottom)
+    centers = centers[(centers[:, 0] >= left + half_size) & (centers[:, 0] < right - half_size) &
+                      (centers[:, 1] >= top + half_size) & (centers[:, 1] < bottom - half_size)]
+    if not len(centers):
+        return None
+    offsets = np.arange(-half_size, half_size)
+    xs = centers[:, 0, None] + offsets
+    ys = centers[:, 1, None] + offsets
+    pixels = pygame.surfarray.pixels2d(surface)
+    pixels[xs[:, :, None], ys[:, None, :]] = surface.map_rgb(color)
+    del pixels
+    left, top = centers.min(axis=0) - half_size
+    right, bottom = centers.max(axis=0) + half_size
+    return pygame.Rect(int(left), int(top), int(right - left), int(bottom - top))
+
+
+def draw_kinds_on_board(surface, board, positions, kinds, classes):
+    """Draw a square for each of positions, a (n, 2) array of board cells, one pass per
+    kind. kinds is an array of indices into classes, which have a size (in cells) and a
+    color. Only squares in the board's viewport are drawn.
+    Returns the pygame.Rects drawn over (one bounding rect per kind)."""
+    if not len(positions):
+        return []
+    board_rect = board.get_scaled_board_rect()
+    top_left = board_rect.get_top_left()
+    cell_size = board_rect.w / board.size.x
+    pixels = ((positions + 0.5) * cell_size + (top_left.x, top_left.y)).astype(np.int32)
+    viewport = board.get_viewport_rect()
+
+    rects = []
+    for kind, kind_class in enumerate(classes):
+        half_size = max(int(kind_class.size * cell_size / 2), 1)
+        rect = draw_squares(surface, pixels[kinds == kind], half_size, kind_class.color,
+                            viewport)
+        if rect:
+            rects.append(rect)
+    return rects
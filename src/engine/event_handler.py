@@ -1,18 +1,49 @@
+from collections import Counter
+
 import pygame
+from engine.assets import Assets
 from engine.display import Display
+from engine.hit_test_index import HitTestIndex
+from engine.profiler import Profiler
+from engine.ui_element import UIElement
 from engine.vector2 import Vector2
 
 
 class _Handler:
+    """ Gets the events from pygame each tick and sends them to the listeners.
+
+    Only event types something listens for are let into pygame's queue (set_allowed), so
+    nothing is spent on the rest. Each tick, a run of mouse motion events in a row is
+    merged into one (the latest position, with the movement of the whole run) and only the
+    latest resize is kept, so a fast mouse sweep or a window drag costs the listeners one
+    event rather than dozens. Clicks and key presses are never merged.
+
+    dispatch_counts counts the events sent to listeners by type, and coalesced the events
+    merged away.
+
+    The events come from source, pygame's queue unless set (eg to an InputReplayer's
+    get_events). If recorder is set (eg to an InputRecorder), its record is given the events
+    sent each tick. """
 
     last_events = None
     listeners = None
+    hit_test_index = None  # UI elements that get mouse events when the mouse is over them
+
+    dispatch_counts = None  # event type -> events sent to listeners
+    coalesced = 0  # Events merged into a later event rather than sent
+
+    source = None  # Function returning this tick's events, None for pygame.event.get
+    recorder = None  # Has record(events) called with the events sent each tick
+
+    _allowed_stale = True  # Has a listener been added for a new type since set_allowed?
 
     def __init__(self):
         self.events = []
         self.listeners = {}
+        self.hit_test_index = HitTestIndex()
+        self.dispatch_counts = Counter()
 
-        self.add_listener(pygame.VIDEORESIZE, lambda e: Display.resize(Vector2(e.w, e.h)))
+        self.add_listener(pygame.VIDEORESIZE, self.resize_listener)
         self.add_listener(pygame.QUIT, lambda e: quit())
 
     def add_listener(self, event_type, function):
@@ -20,16 +51,81 @@ class _Handler:
         The listener is to be a function that takes the pygame event associated with it. """
         if event_type not in self.listeners:
             self.listeners[event_type] = []
+            self._allowed_stale = True
         self.listeners[event_type].append(function)
 
+    @staticmethod
+    def resize_listener(event):
+        """ Resize the display and lay the UI out again for the new size. """
+        Display.resize(Vector2(event.w, event.h))
+        UIElement.invalidate_all_layouts()
+        Assets.clear_scaled()
+
+    def update_allowed(self):
+        """ Only let the event types with listeners (or used by the hit test index) into
+        pygame's queue. Needs the display started. """
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self.listeners) + list(self.hit_test_index.event_types))
+        self._allowed_stale = False
+
     def run(self):
         """ Run the event handler.
         Should the listeners be run? """
-        self.events = pygame.event.get()
+        events = pygame.event.get() if self.source is None else self.source()
+        if self._allowed_stale:
+            # After the get, as blocking a type drops the events of it already queued
+            self.update_allowed()
+        self.events = self.coalesce(events)
+        if self.recorder is not None:
+            self.recorder.record(self.events)
         for event in self.events:
+            self.dispatch_counts[event.type] += 1
+            self.hit_test_index.dispatch(event)
             if event.type in self.listeners:
+                if Profiler.detailed and Profiler.enabled:
+                    self._dispatch_timed(event)
+                    continue
                 for function in self.listeners[event.type]:
                     function(event)
 
+    def _dispatch_timed(self, event):
+        """ Send the event to its listeners, timing each as a profiler phase. """
+        for function in self.listeners[event.type]:
+            with Profiler.phase(getattr(function, "__qualname__", "listener")):
+                function(event)
+
+    def coalesce(self, events):
+        """ Merge each run of mouse motion events into its last event and drop all but the
+        last resize event. Returns the events left, in order. """
+        # pylint: disable=no-member
+        last_resize = None
+        for event in events:
+            if event.type == pygame.VIDEORESIZE:
+                last_resize = event
+
+        coalesced = []
+        run_rel = None  # Movement of the motion events merged into the next
+        for i, event in enumerate(events):
+            if event.type == pygame.VIDEORESIZE and event is not last_resize:
+                continue
+            if event.type == pygame.MOUSEMOTION:
+                if i + 1 < len(events) and events[i + 1].type == pygame.MOUSEMOTION:
+                    rel = event.rel
+                    run_rel = rel if run_rel is None else \
+                        (run_rel[0] + rel[0], run_rel[1] + rel[1])
+                    continue
+                if run_rel is not None:
+                    rel = (run_rel[0] + event.rel[0], run_rel[1] + event.rel[1])
+                    event = pygame.event.Event(pygame.MOUSEMOTION, event.dict, rel=rel)
+                    run_rel = None
+            coalesced.append(event)
+        self.coalesced += len(events) - len(coalesced)
+        return coalesced
+
+    def get_dispatch_counts(self):
+        """ Events sent to listeners so far, by event type name. """
+        return {pygame.event.event_name(event_type): count
+                for event_type, count in self.dispatch_counts.items()}
+
 
 EventHandler = _Handler()
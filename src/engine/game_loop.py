@@ -0,0 +1,91 @@
+"""Contains the GameLoop class
+
+    Typical usage:
+
+    loop = GameLoop(game.update, game.show)
+    loop.run()
+"""
+import time
+
+import pygame
+
+from engine.clock import Clock
+from engine.profiler import Profiler
+
+
+class GameLoop:
+    """Fixed timestep game loop with a frame limiter and speed multiplier.
+
+    update is called once per tick of Clock.dt simulated seconds and steps the Clock. Ticks
+    are run to keep the simulation speed times ahead of real time, independent of how often
+    render is called. render is called once per frame, at most max_fps times a second.
+
+    Attributes:
+        speed: how many simulated seconds pass per real second. None is unlimited - as many
+            ticks as fit in each frame.
+        max_fps: render rate cap. None for no cap.
+        max_lag: the most real seconds of ticks that are caught up on in one frame. Stops a
+            slow frame from causing more ticks, which cause a slower frame, and so on.
+    """
+    speeds = (1, 2, 8, None)
+
+    update = None
+    render = None
+    speed = 1
+    max_fps = 60
+    max_lag = 0.25
+
+    _accumulator = 0.0
+    _last_time = None
+    _frame_clock = None
+
+    def __init__(self, update, render=None, speed=1, max_fps=60):
+        self.update = update
+        self.render = render
+        self.speed = speed
+        self.max_fps = max_fps
+        self._frame_clock = pygame.time.Clock()
+
+    def set_speed(self, speed):
+        """Change the speed multiplier. See speeds for the usual options."""
+        self.speed = speed
+        self._accumulator = 0.0
+
+    def run(self, max_ticks=None):
+        """Run frames forever, or until max_ticks ticks have been run."""
+        end_tick = None if max_ticks is None else Clock.tick + max_ticks
+        self._last_time = time.perf_counter()
+        while end_tick is None or Clock.tick < end_tick:
+            self.run_frame(end_tick)
+
+    def run_frame(self, end_tick=None):
+        """Run the ticks that are due, render and wait out the rest of the frame."""
+        Profiler.begin_frame()
+        now = time.perf_counter()
+        if self._last_time is None:
+            self._last_time = now
+
+        if self.speed is None:
+            frame_end = now + (1 / self.max_fps if self.max_fps else 0)
+            self._tick()
+            while time.perf_counter() < frame_end and Clock.tick != end_tick:
+                self._tick()
+        else:
+            elapsed = min(now - self._last_time, self.max_lag)
+            self._accumulator += elapsed * self.speed
+            while self._accumulator >= Clock.dt and Clock.tick != end_tick:
+                self._accumulator -= Clock.dt
+                self._tick()
+        self._last_time = now
+
+        if self.render:
+            with Profiler.phase("render"):
+                self.render()
+        Profiler.end_frame()
+        if self.max_fps and self.speed is not None:
+            self._frame_clock.tick(self.max_fps)
+
+    def _tick(self):
+        with Profiler.phase("tick"):
+            self.update()
+        Clock.step()
@@ -0,0 +1,108 @@
+"""Contains the HitTestIndex class
+
+    Typical usage:
+
+    index = HitTestIndex()
+    index.add(button)   # button has on_mouse_enter, on_mouse_leave, on_mouse_down, on_mouse_up
+
+    for event in events:
+        index.dispatch(event)
+"""
+# pylint: disable=import-error
+import pygame
+
+from engine.ui_element import UIElement
+from engine.vector2 import Vector2
+
+
+class HitTestIndex:
+    """Finds the topmost UI element under the mouse and sends it the mouse events.
+
+    The final rects of the elements are bucketed into a uniform grid of cell_size pixel
+    cells, so finding the element under a point only tests the elements in one bucket. The
+    grid is rebuilt the first time it's used after the layout of any element changes.
+
+    Elements added later are on top. Each element needs on_mouse_enter, on_mouse_leave,
+    on_mouse_down and on_mouse_up methods that take the pygame event:
+        on_mouse_enter/on_mouse_leave: the mouse moved on to/off the element.
+        on_mouse_down: a mouse button was pressed over the element.
+        on_mouse_up: a mouse button was released after being pressed over the element.
+    """
+    cell_size = 64
+    # pylint: disable=no-member
+    event_types = (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+    elements = None
+    hovered = None  # element the mouse is over
+    pressed = None  # element the mouse was pressed over
+
+    _grid = None  # (column, row) -> [(order, element)]
+    _grid_generation = None
+
+    def __init__(self):
+        self.elements = []
+
+    def add(self, element):
+        """Add the element, on top of the elements already added."""
+        self.elements.append(element)
+        self._grid = None
+
+    def remove(self, element):
+        """Stop sending the element mouse events."""
+        self.elements.remove(element)
+        if self.hovered is element:
+            self.hovered = None
+        if self.pressed is element:
+            self.pressed = None
+        self._grid = None
+
+    def get_element_at(self, position):
+        """Get the topmost element under position (an (x, y) tuple), or None."""
+        if self._grid is None or self._grid_generation != UIElement.layout_generation:
+            self.build()
+        bucket = self._grid.get((int(position[0] // self.cell_size),
+                                 int(position[1] // self.cell_size)))
+        if not bucket:
+            return None
+        vector = Vector2(position[0], position[1])
+        for _, element in reversed(bucket):
+            if element.get_final_rect().is_touching(vector):
+                return element
+        return None
+
+    def build(self):
+        """Bucket the final rect of every element into the grid."""
+        self._grid = {}
+        for order, element in enumerate(self.elements):
+            rect = element.get_final_rect()
+            for column in range(int(rect.get_left() // self.cell_size),
+                                int(rect.get_right() // self.cell_size) + 1):
+                for row in range(int(rect.get_bottom() // self.cell_size),
+                                 int(rect.get_top() // self.cell_size) + 1):
+                    self._grid.setdefault((column, row), []).append((order, element))
+        self._grid_generation = UIElement.layout_generation
+
+    def dispatch(self, event):
+        """Send a mouse event to the element(s) it concerns."""
+        # pylint: disable=no-member
+        if event.type not in self.event_types:
+            return
+        self._update_hovered(event)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.pressed = self.hovered
+            if self.pressed:
+                self.pressed.on_mouse_down(event)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if self.pressed:
+                self.pressed.on_mouse_up(event)
+            self.pressed = None
+
+    def _update_hovered(self, event):
+        """Tell the elements the mouse moved off/on to if the topmost element has changed."""
+        element = self.get_element_at(event.pos)
+        if element is not self.hovered:
+            if self.hovered:
+                self.hovered.on_mouse_leave(event)
+            self.hovered = element
+            if element:
+                element.on_mouse_enter(event)
@@ -0,0 +1,172 @@
+"""Contains the InputRecorder and InputReplayer
+
+    Typical usage:
+
+    recorder = InputRecorder("session.rec")  # After Display.start
+    EventHandler.recorder = recorder
+    ... play ...
+    recorder.close()
+
+    replayer = InputReplayer("session.rec")
+    Display.size = replayer.display_size  # Before Display.start
+    EventHandler.source = replayer.get_events
+    ... run replayer.end_tick ticks ...
+"""
+import struct
+
+import pygame
+
+from engine.clock import Clock
+from engine.display import Display
+from engine.vector2 import Vector2
+
+MAGIC = b"TDIR"
+VERSION = 1
+
+# magic, version, display width, display height
+HEADER = struct.Struct("<4sBHH")
+# tick, event code - followed by the payload for the code
+RECORD = struct.Struct("<IB")
+
+END = 0  # Event code of the last record, at the tick the recording stopped
+
+# pylint: disable=no-member
+# Event code -> (event type, payload struct). Only the attributes the listeners read are kept.
+EVENT_FORMATS = {
+    1: (pygame.MOUSEMOTION, struct.Struct("<hhhhB")),  # pos, rel, buttons (bit mask)
+    2: (pygame.MOUSEBUTTONDOWN, struct.Struct("<hhB")),  # pos, button
+    3: (pygame.MOUSEBUTTONUP, struct.Struct("<hhB")),  # pos, button
+    4: (pygame.MOUSEWHEEL, struct.Struct("<bb")),  # x, y
+    5: (pygame.KEYDOWN, struct.Struct("<iH")),  # key, mod
+    6: (pygame.KEYUP, struct.Struct("<iH")),  # key, mod
+    7: (pygame.VIDEORESIZE, struct.Struct("<HH")),  # w, h
+}
+EVENT_CODES = {event_type: code for code, (event_type, _) in EVENT_FORMATS.items()}
+
+
+def _clamp(value, low, high):
+    return min(max(int(value), low), high)
+
+
+def pack_event(event):
+    """The payload values of the event, or None if its type isn't recorded."""
+    # pylint: disable=no-member
+    if event.type == pygame.MOUSEMOTION:
+        buttons = sum(1 << i for i, pressed in enumerate(event.buttons) if pressed)
+        return (event.pos[0], event.pos[1],
+                _clamp(event.rel[0], -32768, 32767), _clamp(event.rel[1], -32768, 32767),
+                buttons)
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        return event.pos[0], event.pos[1], event.button
+    if event.type == pygame.MOUSEWHEEL:
+        return _clamp(event.x, -128, 127), _clamp(event.y, -128, 127)
+    if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+        return event.key, event.mod
+    if event.type == pygame.VIDEORESIZE:
+        return event.w, event.h
+    return None
+
+
+def unpack_event(code, values):
+    """The pygame event for the code and unpacked payload."""
+    # pylint: disable=no-member
+    event_type = EVENT_FORMATS[code][0]
+    if event_type == pygame.MOUSEMOTION:
+        x, y, rel_x, rel_y, buttons = values
+        return pygame.event.Event(event_type, pos=(x, y), rel=(rel_x, rel_y),
+                                  buttons=tuple(bool(buttons & (1 << i)) for i in range(3)))
+    if event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        return pygame.event.Event(event_type, pos=values[:2], button=values[2])
+    if event_type == pygame.MOUSEWHEEL:
+        return pygame.event.Event(event_type, x=values[0], y=values[1], flipped=False)
+    if event_type in (pygame.KEYDOWN, pygame.KEYUP):
+        return pygame.event.Event(event_type, key=values[0], mod=values[1])
+    return pygame.event.Event(event_type, w=values[0], h=values[1], size=values)
+
+
+class InputRecorder:
+    """Writes the events EventHandler sends to the listeners to a file, with the tick they
+    were sent on, so the session can be replayed with InputReplayer.
+
+    The file is a header (magic, format version and display size) followed by a record
+    per event: the tick (uint32), an event code (uint8, see EVENT_FORMATS) and a fixed size
+    payload of just what the listeners read - 7 to 14 bytes an event. Events of other types
+    (eg QUIT) aren't recorded. close writes an END record at the tick the recording stopped.
+
+    Attributes:
+        count: events recorded.
+    """
+
+    file = None
+    count = 0
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, Display.size.x, Display.size.y))
+
+    def record(self, events):
+        """Add the events sent this tick. Set as EventHandler.recorder to be called."""
+        for event in events:
+            code = EVENT_CODES.get(event.type)
+            if code is None:
+                continue
+            values = pack_event(event)
+            self.file.write(RECORD.pack(Clock.tick, code) + EVENT_FORMATS[code][1].pack(*values))
+            self.count += 1
+
+    def close(self):
+        """Write the END record and close the file."""
+        if self.file.closed:
+            return
+        self.file.write(RECORD.pack(Clock.tick, END))
+        self.file.close()
+
+
+class InputReplayer:
+    """Reads a file written by InputRecorder and gives back its events on the ticks they
+    were recorded on. Set get_events as EventHandler.source, and run from tick 0 (a fresh
+    Clock) for the ticks to line up.
+
+    Attributes:
+        display_size: Vector2 size of the display when the recording started.
+        end_tick: the tick the recording stopped at - run this many ticks to replay it all.
+        ticks: tick -> the events sent on it, in order.
+        count: events in the recording.
+    """
+
+    display_size = None
+    end_tick = 0
+    ticks = None
+    count = 0
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, width, height = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("{} isn't an input recording".format(path))
+        if version != VERSION:
+            raise ValueError("{} is a version {} input recording, expected version {}".format(
+                path, version, VERSION))
+        self.display_size = Vector2(width, height)
+
+        self.ticks = {}
+        offset = HEADER.size
+        while offset < len(data):
+            tick, code = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if code == END:
+                self.end_tick = tick
+                break
+            payload = EVENT_FORMATS[code][1]
+            self.ticks.setdefault(tick, []).append(
+                unpack_event(code, payload.unpack_from(data, offset)))
+            offset += payload.size
+            self.count += 1
+        else:
+            # No END record (eg the recording process was killed) - stop after the last event
+            self.end_tick = max(self.ticks, default=-1) + 1
+
+    def get_events(self):
+        """The events recorded on this tick (Clock.tick)."""
+        return self.ticks.get(Clock.tick, [])
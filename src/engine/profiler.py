@@ -0,0 +1,213 @@
+"""Contains the Profiler
+
+    Typical usage:
+
+    Profiler.enable()
+
+    Profiler.begin_frame()
+    with Profiler.phase("update"):
+        ...
+    Profiler.end_frame()
+
+    Profiler.export_trace("trace.json")  # Open in chrome://tracing or Perfetto
+"""
+import json
+import time
+from collections import deque
+
+import pygame
+
+from engine.display import Display
+
+
+class _Phase:
+    """Times the code in its with block into the profiler."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exception):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NullPhase:
+    """Stands in for _Phase while the profiler is disabled, doing nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exception):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Profiler:
+    """Times the phases of each frame.
+
+    Code to be timed is wrapped in with Profiler.phase(name) blocks, which can nest. Each
+    frame (begin_frame to end_frame) the time spent in each phase is summed, and the last
+    frame_count frames are kept in a ring buffer for the overlay and percentiles. Every
+    phase is also kept as a trace event (up to max_trace_events, oldest dropped first) for
+    export_trace. Stats (eg the live, free and high water counts of a manager's rows) added
+    with add_stats are shown under the phases in the overlay.
+
+    While disabled, phase returns a shared do-nothing block and begin_frame/end_frame return
+    straight away, so the instrumentation can stay in place.
+
+    Attributes:
+        enabled: are phases being timed?
+        detailed: also time each event listener (see EventHandler.run).
+        overlay: is the overlay shown?
+        frames: (start, duration, {phase name: seconds}) of the recent frames.
+        trace: (phase name, start, duration) of the recent phases, times in seconds.
+        stats: name -> function returning a dict of counts, for the overlay.
+    """
+
+    frame_count = 300
+    max_trace_events = 100000
+    overlay_color = (0, 0, 0)
+    overlay_background = (255, 255, 255)
+
+    enabled = False
+    detailed = False
+    overlay = False
+
+    frames = None
+    trace = None
+    stats = None
+
+    _frame_start = None
+    _frame_phases = None
+    _font = None
+
+    def __init__(self):
+        self.frames = deque(maxlen=self.frame_count)
+        self.trace = deque(maxlen=self.max_trace_events)
+        self.stats = {}
+
+    def enable(self, detailed=False):
+        """Start timing phases."""
+        self.enabled = True
+        self.detailed = detailed
+
+    def disable(self):
+        """Stop timing phases and hide the overlay. Recorded frames are kept."""
+        self.enabled = False
+        self.overlay = False
+        self._frame_start = None
+
+    def toggle_overlay(self):
+        """Show or hide the overlay, enabling the profiler if it's not already."""
+        self.overlay = not self.overlay
+        if self.overlay and not self.enabled:
+            self.enable()
+
+    def clear(self):
+        """Forget the recorded frames and trace."""
+        self.frames.clear()
+        self.trace.clear()
+
+    def add_stats(self, name, function):
+        """Show the dict of counts function returns (eg ProjectileManager.get_stats) in the
+        overlay as name. Adding a name again replaces its function."""
+        self.stats[name] = function
+
+    def phase(self, name):
+        """A with block timing the code inside it as the phase."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def record(self, name, start, end):
+        """Add a phase that ran from start to end (time.perf_counter seconds)."""
+        self.trace.append((name, start, end - start))
+        if self._frame_phases is not None:
+            self._frame_phases[name] = self._frame_phases.get(name, 0) + end - start
+
+    def begin_frame(self):
+        """Start timing a frame."""
+        if not self.enabled:
+            return
+        self._frame_start = time.perf_counter()
+        self._frame_phases = {}
+
+    def end_frame(self):
+        """Finish timing the frame and add it to the ring buffer."""
+        if self._frame_start is None:
+            return
+        end = time.perf_counter()
+        self.record("frame", self._frame_start, end)
+        self.frames.append((self._frame_start, end - self._frame_start, self._frame_phases))
+        self._frame_start = None
+        self._frame_phases = None
+
+    def get_percentiles(self, percentiles=(50, 95, 99, 100)):
+        """Frame times (seconds) at the percentiles over the recent frames.
+        Returns {percentile: seconds}, empty if no frames have been recorded."""
+        durations = sorted(frame[1] for frame in self.frames)
+        if not durations:
+            return {}
+        return {percentile: durations[min(int(len(durations) * percentile / 100),
+                                          len(durations) - 1)]
+                for percentile in percentiles}
+
+    def get_phase_means(self):
+        """Mean seconds per frame spent in each phase over the recent frames, slowest first."""
+        totals = {}
+        for _, _, phases in self.frames:
+            for name, seconds in phases.items():
+                totals[name] = totals.get(name, 0) + seconds
+        return sorted(((name, total / len(self.frames)) for name, total in totals.items()),
+                      key=lambda item: -item[1])
+
+    def show_overlay(self, surface=None):
+        """Draw the frame time percentiles, phase means and stats in the top left of surface
+        (default Display.surface). Returns the pygame.Rects drawn over."""
+        if not self.overlay:
+            return []
+        if surface is None:
+            surface = Display.surface
+        if self._font is None:
+            pygame.font.init()
+            self._font = pygame.font.Font(None, 18)
+
+        lines = ["frame ms  " + "  ".join(
+            "p{} {:.2f}".format(percentile, seconds * 1000)
+            for percentile, seconds in self.get_percentiles().items())]
+        lines += ["{:<12} {:.3f}".format(name, seconds * 1000)
+                  for name, seconds in self.get_phase_means()[:12]]
+        lines += ["{:<12} ".format(name) + "  ".join(
+            "{} {}".format(key, value) for key, value in function().items())
+                  for name, function in self.stats.items()]
+        line_height = self._font.get_linesize()
+        images = [self._font.render(line, True, self.overlay_color) for line in lines]
+        rect = pygame.Rect(0, 0, max(image.get_width() for image in images) + 8,
+                           line_height * len(images) + 8)
+        surface.fill(self.overlay_background, rect)
+        for i, image in enumerate(images):
+            surface.blit(image, (4, 4 + i * line_height))
+        return [rect]
+
+    def export_trace(self, path):
+        """Write the trace as Chrome trace event JSON, for chrome://tracing or Perfetto."""
+        origin = min((start for _, start, _ in self.trace), default=0)
+        events = [{"name": name, "ph": "X", "pid": 0, "tid": 0,
+                   "ts": (start - origin) * 1e6, "dur": duration * 1e6}
+                  for name, start, duration in self.trace]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+Profiler = _Profiler()
@@ -7,7 +7,8 @@ from engine.vector2 import Vector2
 
 
 class Rect:
-    """Rect representation.
+    """Rect representation. Treat as immutable - rects are hashed and cached (see
+    UIElement.get_final_rect), so make a new one rather than changing one.
 
     class stores each component as an attribute, rather than position and size.
     Position of rect (x and y attributes) describe the center of the rect.
@@ -22,19 +23,19 @@ class Rect:
     # pylint: disable=invalid-name
     # pylint: disable=missing-function-docstring
 
+    __slots__ = ("x", "y", "w", "h")
+
     def __init__(self, x=0, y=0, w=0, h=0):
         self.x = x
         self.y = y
         self.w = w
         self.h = h
 
-    def set_position(self, center_vector):
-        self.x = center_vector.x
-        self.y = center_vector.y
+    def with_position(self, center_vector):
+        return Rect(center_vector.x, center_vector.y, self.w, self.h)
 
-    def set_size(self, size_vector):
-        self.w = size_vector.x
-        self.h = size_vector.y
+    def with_size(self, size_vector):
+        return Rect(self.x, self.y, size_vector.x, size_vector.y)
 
     def get_position(self):
         return Vector2(self.x, self.y)
@@ -91,5 +92,15 @@ class Rect:
     def __str__(self):
         return "Rect({}, {}, {}, {})".format(self.x, self.y, self.w, self.h)
 
+    def __repr__(self):
+        return self.__str__()
+
+    def __eq__(self, other):
+        return other.__class__ is Rect and self.x == other.x and self.y == other.y and \
+            self.w == other.w and self.h == other.h
+
+    def __hash__(self):
+        return hash((self.x, self.y, self.w, self.h))
+
     def get_pygame_tuple(self):
         return int(self.x - self.w / 2), int(self.y - self.h / 2), int(self.w), int(self.h)
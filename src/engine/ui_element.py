@@ -66,6 +66,10 @@ class UIElement:
         offset_mode: Rect on how to treat offset. See ScaleModes
         parent: the parent object of the element. Allows the element to be scaled/positioned
             relative to the parent.
+
+    The final rect of each element is cached. The cache of every element is dropped when the
+    window is resized (see invalidate_all_layouts); call invalidate_layout after changing
+    rect, offset or any of the modes so the element and its children are laid out again.
     """
     # pylint: disable=too-few-public-methods
 
@@ -75,11 +79,18 @@ class UIElement:
     offset = None
     offset_mode = None
 
-    parent = None
     inherit = Rect(True, True, True, True)
 
+    _parent = None
+    _children = None
+
     _last_display_rect = None  # rect in pixels that the element took up last time it was shown
 
+    _layout_version = 0  # Bumped to drop the cached final rect of every element
+    layout_generation = 0  # Bumped whenever any layout changes, for caches over many elements
+    _final_rect = None
+    _final_rect_version = None
+
     def __init__(self, rect,
                  scale_mode=Rect(ScaleModes.absolute, ScaleModes.absolute,
                                  ScaleModes.absolute, ScaleModes.absolute),
@@ -97,12 +108,45 @@ class UIElement:
         self.offset = offset
         self.offset_mode = offset_mode
 
+        self._children = []
+
         self.init()
 
     def init(self):
         """ Called by __init__ so you don't need to copy all the parameters again.
         Override this to add things to __init__. """
 
+    @property
+    def parent(self):
+        """The element this one is positioned/scaled relative to."""
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        if self._parent is not None:
+            self._parent._children.remove(self)
+        self._parent = parent
+        if parent is not None:
+            parent._children.append(self)
+        self.invalidate_layout()
+
+    # ==================================================
+    # Layout
+    # ==================================================
+
+    def invalidate_layout(self):
+        """Drop the cached final rect of this element and all of its children."""
+        self._final_rect = None
+        UIElement.layout_generation += 1
+        for child in self._children:
+            child.invalidate_layout()
+
+    @staticmethod
+    def invalidate_all_layouts():
+        """Drop the cached final rect of every element. Called when the window is resized."""
+        UIElement._layout_version += 1
+        UIElement.layout_generation += 1
+
     # ==================================================
     # Display-ers
     # ==================================================
@@ -139,23 +183,23 @@ class UIElement:
     # ==================================================
 
     def get_final_rect(self):
-        """Get the position center position of the element the display (in pixels)."""
-        return self.get_scaled_rect() + self.get_scaled_offset() + self.get_parent_offset()
+        """Get the position center position of the element the display (in pixels).
+        Cached until the layout is invalidated, so don't modify the returned rect."""
+        if self._final_rect is None or self._final_rect_version != UIElement._layout_version:
+            self._final_rect = self.get_scaled_rect() + self.get_scaled_offset() + \
+                self.get_parent_offset()
+            self._final_rect_version = UIElement._layout_version
+        return self._final_rect
 
     def get_parent_offset(self):
         """How much does the parent offset the final rect?"""
-        rect = Rect()
-        if self.parent:
-            parent_rect = self.parent.get_final_rect()
-            if self.inherit.x:
-                rect.x = parent_rect.x
-            if self.inherit.y:
-                rect.y = parent_rect.y
-            if self.inherit.w:
-                rect.w = parent_rect.w
-            if self.inherit.h:
-                rect.h = parent_rect.h
-        return rect
+        if not self.parent:
+            return Rect()
+        parent_rect = self.parent.get_final_rect()
+        return Rect(parent_rect.x if self.inherit.x else 0,
+                    parent_rect.y if self.inherit.y else 0,
+                    parent_rect.w if self.inherit.w else 0,
+                    parent_rect.h if self.inherit.h else 0)
 
     def get_scaled_rect(self):
         """ Scale up the rect according to scale_mode. """
@@ -1,6 +1,11 @@
 
 
 class Vector2:
+    """ 2D vector. Treat as immutable - vectors are hashed (so can be dict keys or set members)
+    and the constant directions (one, left, ...) are shared instances rather than new ones.
+    Arithmetic returns new vectors. """
+
+    __slots__ = ("x", "y")
 
     def __init__(self, x, y):
         self.x = x
@@ -32,7 +37,10 @@ class Vector2:
         return self.__str__()
 
     def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+        return other.__class__ is Vector2 and self.x == other.x and self.y == other.y
+
+    def __hash__(self):
+        return hash((self.x, self.y))
 
     def get_pygame_tuple(self):
         return int(self.x), int(self.y)
@@ -41,22 +49,44 @@ class Vector2:
     def component_mul(vec1, vec2):
         return Vector2(vec1.x * vec2.x, vec1.y * vec2.y)
 
+    @staticmethod
+    def translate_all(vectors, offset):
+        """ Add offset to every vector in one pass. Returns a list. """
+        dx = offset.x
+        dy = offset.y
+        return [Vector2(vector.x + dx, vector.y + dy) for vector in vectors]
+
+    @staticmethod
+    def scale_all(vectors, scale, offset=None):
+        """ Multiply every vector by scale then add offset, in one pass. Returns a list.
+        eg cells to pixels: Vector2.scale_all(cells, cell_size, board_top_left) """
+        dx = offset.x if offset else 0
+        dy = offset.y if offset else 0
+        return [Vector2(vector.x * scale + dx, vector.y * scale + dy) for vector in vectors]
+
     @staticmethod
     def one():
-        return Vector2(1, 1)
+        return _ONE
 
     @staticmethod
     def left():
-        return Vector2(-1, 0)
+        return _LEFT
 
     @staticmethod
     def right():
-        return Vector2(1, 0)
+        return _RIGHT
 
     @staticmethod
     def up():
-        return Vector2(0, 1)
+        return _UP
 
     @staticmethod
     def down():
-        return Vector2(0, -1)
+        return _DOWN
+
+
+_ONE = Vector2(1, 1)
+_LEFT = Vector2(-1, 0)
+_RIGHT = Vector2(1, 0)
+_UP = Vector2(0, 1)
+_DOWN = Vector2(0, -1)
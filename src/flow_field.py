@@ -0,0 +1,112 @@
+import numpy as np
+from engine.vector2 import Vector2
+from board import DIRECTIONS
+
+UNREACHABLE = -1
+
+
+def compute_field(board, targets):
+    """ Breadth first search out from the free cells of targets (Vector2s on the board).
+    Returns (distances, next_cells), flat arrays as described in FlowField. """
+    width = board.size.x
+    height = board.size.y
+    free = (board.occupancy == 0).reshape(-1)
+    distances = np.full(width * height, UNREACHABLE, dtype=np.int32)
+    next_cells = np.full(width * height, UNREACHABLE, dtype=np.int32)
+
+    frontier = np.unique(np.array([cell.y * width + cell.x for cell in targets], dtype=np.int32))
+    frontier = frontier[free[frontier]]
+    distances[frontier] = 0
+    distance = 0
+    while frontier.size:
+        distance += 1
+        x = frontier % width
+        reached = []
+        for dx, dy in DIRECTIONS:
+            sources = frontier
+            if dx:
+                sources = frontier[(x + dx >= 0) & (x + dx < width)]
+            cells = sources + dy * width + dx
+            if dy:
+                in_bounds = (cells >= 0) & (cells < width * height)
+                cells = cells[in_bounds]
+                sources = sources[in_bounds]
+            new = free[cells] & (distances[cells] == UNREACHABLE)
+            cells = cells[new]
+            distances[cells] = distance
+            next_cells[cells] = sources[new]
+            reached.append(cells)
+        frontier = np.concatenate(reached)
+    return distances, next_cells
+
+
+class FlowField:
+    """ Distance to the nearest exit from every cell of a board.
+
+    One reverse breadth first search from the exits fills in the distance and the next step
+    for every cell, so any number of units can look up where to go from wherever they are
+    without running their own search. The search is only re-run the first time the field is
+    used after the board changes.
+
+    Cells are flat indices, y * board.size.x + x, into the arrays:
+        distances: steps to the nearest exit, UNREACHABLE if none can be reached.
+        next_cells: flat index of the next cell on a shortest path, UNREACHABLE at the
+            exits and for cells that can't reach one.
+
+    Typical usage:
+
+        flow_field = FlowField(board)   # Listens to the board for changes
+        next_cell = flow_field.get_next_cell(cell)
+    """
+
+    board = None
+    exits = None  # Cells to flow to, None for the exits of all the board's routes
+    distances = None
+    next_cells = None
+    dirty = True
+
+    def __init__(self, board, exits=None):
+        self.board = board
+        self.exits = exits
+        board.add_change_listener(self.board_changed)
+
+    def board_changed(self, position):
+        """ Board change listener. Mark the field to be recomputed. """
+        self.dirty = True
+
+    def update(self):
+        """ Recompute the field if the board has changed since it was last computed. """
+        if self.dirty:
+            self.compute()
+
+    def compute(self):
+        """ Breadth first search out from every free exit. """
+        exits = self.board.get_exits() if self.exits is None else self.exits
+        self.distances, self.next_cells = compute_field(self.board, exits)
+        self.dirty = False
+
+    def get_distance(self, cell):
+        """ How many steps from the cell to the nearest exit? UNREACHABLE if the cell is
+        blocked or cut off. """
+        self.update()
+        return int(self.distances[cell.y * self.board.size.x + cell.x])
+
+    def get_next_cell(self, cell):
+        """ The next cell on a shortest path from the cell to the nearest exit.
+        Returns None at an exit or if there is no path. Cells off the board (entries) step on
+        to the board. """
+        self.update()
+        if not self.board.is_on_board(cell):
+            landings = [landing for landing in self.board.get_landing_cells(cell)
+                        if self.get_distance(landing) != UNREACHABLE]
+            return min(landings, key=self.get_distance) if landings else None
+        next_cell = int(self.next_cells[cell.y * self.board.size.x + cell.x])
+        if next_cell == UNREACHABLE:
+            return None
+        y, x = divmod(next_cell, self.board.size.x)
+        return Vector2(x, y)
+
+    def get_distance_grid(self):
+        """ The distances as a (board.size.y, board.size.x) array, indexed [y, x]. """
+        self.update()
+        return self.distances.reshape(self.board.size.y, self.board.size.x)
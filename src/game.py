@@ -3,20 +3,26 @@ from enum import Enum
 
 import pygame
 
+from engine.clock import Clock
 from engine.display import Display
+from engine.profiler import Profiler
 from engine.event_handler import EventHandler
 from engine.vector2 import Vector2
 from engine.rect import Rect
 from engine.state_machine import StateMachine
 from engine.ui_element import ScaleModes
 
-from path_finder import PathFinder
+from incremental_path_finder import IncrementalPathFinder
+from connectivity_index import ConnectivityIndex
 from board import Board
+from enemy_manager import EnemyManager
 from test_tower import TestTower
 from projectile_manager import ProjectileManager
+from tower_scheduler import TowerScheduler
 from tower_selector import TowerSelector
 from test_tower import TestTower
 from tower import Tower
+from enemy_wave import Wave
 
 
 class States(Enum):
@@ -27,7 +33,12 @@ class States(Enum):
 class Game(StateMachine):
     mouse_cell = None  # What cell is the mouse over?
     path = None  # What path will the enemies take?
+    path_finder = None
+    connectivity = None  # Which cells can't be built on without blocking the path?
+    tower_scheduler = None  # Wakes the towers when they can shoot
     state = None
+    wave = None  # The wave being sent in (or last sent in)
+    wave_number = 0
 
     # Tower selector UI styles - should make a css kinda thing?
     max_tower_selector_rect = Rect(0.5, 1, 1, 100)
@@ -68,6 +79,9 @@ class Game(StateMachine):
     tower_selector = None
     board = None
 
+    _background = None  # Copy of the static parts of the frame, to restore under dynamic parts
+    _dynamic_rects = None  # Parts of the frame drawn over the background last frame
+
     def start(self):
         """ Start the game - set the board, path and listeners. """
         self.set_state(States.setup)
@@ -81,31 +95,101 @@ class Game(StateMachine):
                            self.board_rect_scale_mode,
                            self.board_rect_offset,
                            self.board_rect_offset_mode)
+        self.path_finder = IncrementalPathFinder(self.board)
+        self.connectivity = ConnectivityIndex(self.board)
+        EnemyManager.start(self.board)
+        self.tower_scheduler = TowerScheduler(self.board)
+        Profiler.add_stats("projectile rows", ProjectileManager.get_stats)
+        Profiler.add_stats("enemy rows", EnemyManager.get_stats)
         # pylint: disable=no-member
         EventHandler.add_listener(pygame.MOUSEMOTION, self.mouse_motion_listener)
         EventHandler.add_listener(pygame.MOUSEBUTTONUP, self.mouse_up_listener)
+        EventHandler.add_listener(pygame.KEYDOWN, self.key_down_listener)
 
         self.path = []
         self.update_path()
 
     def run_frame(self):
-        """ Run one frame/game update. """
-        EventHandler.run()
-        ProjectileManager.update()
+        """ Run one tick and show it. Nothing is shown in headless mode.
+        Main runs update and show through a GameLoop instead, this is for stepping by hand. """
+        self.update()
+        Clock.step()
+        if not Display.headless:
+            self.show()
 
-        Display.surface.fill((255, 255, 255))
+    def update(self):
+        """ Run the game logic for one tick. """
+        with Profiler.phase("events"):
+            EventHandler.run()
+        with Profiler.phase("enemies"):
+            EnemyManager.update()
+        with Profiler.phase("towers"):
+            self.tower_scheduler.update()
+        with Profiler.phase("projectiles"):
+            ProjectileManager.update()
+        if self.is_in_state(States.in_play) and not self.wave.is_spawning() and \
+                not EnemyManager.count:
+            self.set_state(States.setup)
+
+    def start_wave(self):
+        """ Send in the next wave, if the last one is over. """
+        if self.is_in_state(States.setup):
+            self.wave_number += 1
+            self.wave = Wave.get_wave(self.wave_number)
+            self.set_state(States.in_play)
+            self.wave.start()
+
+    def show(self):
+        """ Draw the frame and push the parts that changed to the window.
+        The static parts (board background, grid, towers and tower selector) are kept in
+        _background. Each frame only the dynamic parts (mouse over cell, enemies,
+        projectiles) and static parts that changed are redrawn. """
+        surface = Display.surface
+        if self._background is None or self._background.get_size() != surface.get_size() or \
+                self.board.is_layer_stale():
+            self.show_static()
+        else:
+            for rect in self._dynamic_rects:
+                surface.blit(self._background, rect, rect)
+            Display.mark_dirty(self._dynamic_rects)
+
+            static_rects = self.board.show_layer_changes()
+            if self.tower_selector.has_changed():
+                self.tower_selector.show_towers()
+                static_rects += [icon.get_final_rect().get_pygame_tuple()
+                                 for icon in self.tower_selector.icons]
+            for rect in static_rects:
+                self._background.blit(surface, rect, rect)
+            Display.mark_dirty(static_rects)
 
-        self.show_mouse_over_cell()
-        ProjectileManager.show_projectiles()
+        self._dynamic_rects = self.show_dynamic()
+        Display.mark_dirty(self._dynamic_rects)
+        with Profiler.phase("present"):
+            Display.update()
 
-        self.board.show()
+    def show_static(self):
+        """ Redraw all of the static parts of the frame and keep a copy. """
+        Display.surface.fill((255, 255, 255))
+        self.board.show_layer()
         self.tower_selector.show()
+        self._background = Display.surface.copy()
+        Display.mark_all_dirty()
 
-        pygame.display.update()
+    def show_dynamic(self):
+        """ Draw the parts of the frame that can change every frame.
+        Returns the pygame.Rects drawn over. """
+        rects = EnemyManager.show_enemies(self.board)
+        rects += ProjectileManager.show_projectiles(self.board)
+        mouse_cell_rect = self.board.show_mouse_over_cell()
+        if mouse_cell_rect:
+            rects.append(mouse_cell_rect)
+        rects += Profiler.show_overlay()
+        return rects
 
     def update_path(self):
-        """ Run the path finder and update self.path """
-        self.path = PathFinder.find_path(self.board)
+        """ Run the path finder and update self.path
+        The path finder listens to the board, so this only repairs what has changed. """
+        self.path = self.path_finder.find_path()
 
     def show_path(self):
         """ Show the path line
@@ -123,14 +207,23 @@ class Game(StateMachine):
         #                      self.board.get_cell_rect(self.mouse_cell).get_pygame_tuple())
 
     def mouse_motion_listener(self, event):
-        """ When there's a mouse motion event, set the mouse cell. """
-        # mouse_pos = Vector2(event.pos[0], event.pos[1])
-        # mouse_pos -= self.board.get_board_rect().get_top_left()
-        # mouse_pos /= self.board.get_cell_size()
-        # if 0 < mouse_pos.x < self.board.size.x and 0 < mouse_pos.y < self.board.size.y:
-        #     self.mouse_cell = Vector2(int(mouse_pos.x), int(mouse_pos.y))
-        # else:
-        #     self.mouse_cell = None
+        """ When there's a mouse motion event, set the mouse cell.
+        The board listener has already worked out which cell the mouse is over. """
+        self.update_mouse_cell()
+
+    def update_mouse_cell(self):
+        """ Take the mouse cell from the board and preview whether a tower there would
+        block the path. """
+        self.mouse_cell = self.board.mouse_cell
+        self.board.mouse_cell_blocked = self.mouse_cell is not None and \
+            self.board.get_cell_contents(self.mouse_cell) is None and \
+            self.connectivity.would_block(self.mouse_cell)
+
+    def key_down_listener(self, event):
+        """ Space sends in the next wave. """
+        # pylint: disable=no-member
+        if event.key == pygame.K_SPACE:
+            self.start_wave()
 
     def mouse_up_listener(self, event):
         """ When mouse 1 (left) is released, try make a tower.
@@ -139,12 +232,13 @@ class Game(StateMachine):
         if self.mouse_cell:
             if self.board.is_on_board(self.mouse_cell):
                 if event.button == 1:
-                    board_change = self.try_make_tower("HOES", self.mouse_cell)
+                    board_change = self.try_make_tower(TestTower, self.mouse_cell)
                 elif event.button == 3:
                     board_change = self.sell_cell(self.mouse_cell)
 
         if board_change:
             self.update_path()
+            self.update_mouse_cell()
 
     def sell_cell(self, cell):
         """ Clears the cell. Refunding the player the towers refund amount.
@@ -155,17 +249,18 @@ class Game(StateMachine):
         return contains
 
     def try_make_tower(self, tower, cell):
-        """ Try to make a tower at the position.
+        """ Try to make a tower (a Tower class) at the position.
         Checks:
           - position (anything there? on board?)
           - is the tower valid (not None?)
+          - would the tower block the path?
 
         Returns true if new tower was made
         """
         # TODO buy once money is in
         # Is this a valid position? (Anything there already?)
         # Can the player afford this?
-        if self.board.get_cell_contents(cell) is None:
-            self.board.set_cell_contents(TestTower(cell, self.board), cell)
+        if self.board.get_cell_contents(cell) is None and not self.connectivity.would_block(cell):
+            self.board.set_cell_contents(tower(cell, self.board), cell)
             return True
         return False
@@ -0,0 +1,221 @@
+import heapq
+from engine.vector2 import Vector2
+from board import DIRECTIONS
+
+INFINITY = float("inf")
+START = -1  # Virtual cell joined to the cells every entry steps on to
+
+
+class IncrementalPathFinder:
+    """ Lifelong Planning A* (LPA*) across a board, kept up to date as the board changes.
+
+    Finds the same kind of path as PathFinder (from any entry to any exit of the board's
+    routes) but keeps its search state between calls. The search runs backwards: g is the
+    distance from a cell to the nearest exit and the heuristic is the distance back to the
+    box around the cells the entries step on to. START stands for all of the entries. When a
+    cell changes only that cell and its neighbours are re-opened, so the next find_path
+    repairs the affected part of the search rather than starting again.
+
+    Cells are integer keys, y * board.size.x + x, as in PathFinder.
+
+    Typical usage:
+
+        path_finder = IncrementalPathFinder(board)  # Listens to the board for changes
+        path = path_finder.find_path()
+    """
+
+    board = None
+    size = None
+    width = None
+    exit_keys = None
+    landings = None  # key -> (cost to step on from START, entry) for the cells entries lead to
+    column_steps = None  # Heuristic, split into columns and rows
+    row_steps = None
+
+    g = None  # cell -> settled distance to the destination
+    rhs = None  # cell -> one step lookahead distance to the destination
+    open_keys = None  # cell -> priority of its current entry in open_heap
+    open_heap = None
+
+    def __init__(self, board):
+        self.board = board
+        board.add_change_listener(self.cell_changed)
+        self.reset()
+
+    def reset(self):
+        """ Throw away all search state and seed the search from the exits. """
+        board = self.board
+        self.size = (board.size.x, board.size.y)
+        self.width = board.size.x
+        self.exit_keys = {cell.y * self.width + cell.x for cell in board.get_exits()}
+        self.landings = {}
+        for entry in board.get_entries():
+            cost = 0 if board.is_on_board(entry) else 1
+            for cell in board.get_landing_cells(entry):
+                key = cell.y * self.width + cell.x
+                if cost < self.landings.get(key, (INFINITY,))[0]:
+                    self.landings[key] = (cost, entry)
+        xs = [key % self.width for key in self.landings] or [0]
+        ys = [key // self.width for key in self.landings] or [0]
+        self.column_steps = [max(min(xs) - x, 0, x - max(xs)) for x in range(board.size.x)]
+        self.row_steps = [max(min(ys) - y, 0, y - max(ys)) for y in range(board.size.y)]
+
+        self.g = {}
+        self.rhs = {}
+        self.open_keys = {}
+        self.open_heap = []
+        for key in self.exit_keys:
+            if self._is_free(key):
+                self.rhs[key] = 0
+                self._push(key)
+
+    def cell_changed(self, position):
+        """ Board change listener. Re-open the changed cell and the cells leading into it.
+        A position of None (or a resized board) resets the search. """
+        if position is None or self.size != (self.board.size.x, self.board.size.y):
+            self.reset()
+            return
+        key = position.y * self.width + position.x
+        self._update_vertex(key)
+        for predecessor in self._get_predecessors(key, check_free=False):
+            self._update_vertex(predecessor)
+
+    def find_path(self):
+        """ Repair the search and return a shortest path.
+        Returns a list of Vector2 from the entry to the exit, or an empty list if no exit
+        can be reached. """
+        if self.size != (self.board.size.x, self.board.size.y):
+            self.reset()
+        self._compute_shortest_path()
+        return self._get_path()
+
+    # ==================================================
+    # LPA*
+    # ==================================================
+
+    def _compute_shortest_path(self):
+        """ Settle cells until the start is consistent and nothing in the open heap could
+        improve it. """
+        g = self.g
+        rhs = self.rhs
+        while True:
+            top = self._peek()
+            if top is None:
+                return
+            start_g = g.get(START, INFINITY)
+            start_rhs = rhs.get(START, INFINITY)
+            # Ties with START are still processed as on board entries join it at no cost
+            if top > (start_rhs, start_rhs) and start_g == start_rhs:
+                return
+
+            key = heapq.heappop(self.open_heap)[2]
+            del self.open_keys[key]
+            if g.get(key, INFINITY) > rhs.get(key, INFINITY):
+                g[key] = rhs[key]
+            else:
+                g[key] = INFINITY
+                self._update_vertex(key)
+            for predecessor in self._get_predecessors(key):
+                self._update_vertex(predecessor)
+
+    def _update_vertex(self, key):
+        """ Recalculate the rhs of the cell and put it in the open heap if inconsistent. """
+        if key == START:
+            rhs = min((cost + self.g.get(landing, INFINITY)
+                       for landing, (cost, _) in self.landings.items()), default=INFINITY)
+        elif not self._is_free(key):
+            rhs = INFINITY
+        elif key in self.exit_keys:
+            rhs = 0
+        else:
+            g = self.g
+            rhs = INFINITY
+            for successor in self._get_successors(key):
+                cost = g.get(successor, INFINITY) + 1
+                if cost < rhs:
+                    rhs = cost
+        self.rhs[key] = rhs
+
+        self.open_keys.pop(key, None)
+        if self.g.get(key, INFINITY) != rhs:
+            self._push(key)
+
+    def _push(self, key):
+        """ Add the cell to the open heap with its current priority. """
+        distance = min(self.g.get(key, INFINITY), self.rhs.get(key, INFINITY))
+        priority = (distance + self._heuristic(key), distance)
+        self.open_keys[key] = priority
+        heapq.heappush(self.open_heap, (priority[0], priority[1], key))
+
+    def _peek(self):
+        """ Priority of the best open cell, dropping stale heap entries. None if empty. """
+        heap = self.open_heap
+        while heap:
+            k1, k2, key = heap[0]
+            if self.open_keys.get(key) == (k1, k2):
+                return k1, k2
+            heapq.heappop(heap)
+        return None
+
+    def _heuristic(self, key):
+        """ Distance back to the box around the cells the entries step on to. """
+        if key == START:
+            return 0
+        y, x = divmod(key, self.width)
+        return self.column_steps[x] + self.row_steps[y]
+
+    # ==================================================
+    # Board graph
+    # ==================================================
+
+    def _is_free(self, key):
+        """ Can a path go through the cell? START always can. """
+        if key == START:
+            return True
+        y, x = divmod(key, self.width)
+        return self.board.items[y][x] is None
+
+    def _get_successors(self, key):
+        """ Free cells a path can step to from the cell. """
+        if key == START:
+            return [landing for landing in self.landings if self._is_free(landing)]
+        y, x = divmod(key, self.width)
+        return self._get_neighbours(x, y, True)
+
+    def _get_predecessors(self, key, check_free=True):
+        """ Cells a path can step to the cell from. """
+        if key == START:
+            return []
+        y, x = divmod(key, self.width)
+        predecessors = self._get_neighbours(x, y, check_free)
+        if key in self.landings:
+            predecessors.append(START)
+        return predecessors
+
+    def _get_neighbours(self, x, y, check_free):
+        """ Keys of the on board neighbours of (x, y), optionally only the free ones. """
+        neighbours = []
+        items = self.board.items
+        for dx, dy in DIRECTIONS:
+            nx = x + dx
+            ny = y + dy
+            if 0 <= nx < self.size[0] and 0 <= ny < self.size[1]:
+                if not check_free or items[ny][nx] is None:
+                    neighbours.append(ny * self.width + nx)
+        return neighbours
+
+    def _get_path(self):
+        """ Walk down the distances from START to an exit. """
+        g = self.g
+        if g.get(START, INFINITY) == INFINITY:
+            return []
+        key = min(self._get_successors(START),
+                  key=lambda cell: self.landings[cell][0] + g.get(cell, INFINITY))
+        cost, entry = self.landings[key]
+        path = [entry] if cost else []
+        while True:
+            y, x = divmod(key, self.width)
+            path.append(Vector2(x, y))
+            if g[key] == 0:
+                return path
+            key = min(self._get_successors(key), key=lambda cell: g.get(cell, INFINITY))
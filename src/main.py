@@ -1,3 +1,14 @@
+import argparse
+import time
+
+import pygame
+
+from engine.clock import Clock
+from engine.display import Display
+from engine.event_handler import EventHandler
+from engine.game_loop import GameLoop
+from engine.input_recording import InputRecorder, InputReplayer
+from engine.profiler import Profiler
 from game import Game
 
 
@@ -9,8 +20,16 @@ class Main:
     """ State machine for the game. """
 
     current = None
+    loop = None
+    fixed_speed = False  # Ignore the speed keys? (eg when replaying as fast as possible)
+
+    # Number keys to loop speeds - 1x, 2x, 8x, unlimited
+    speed_keys = {pygame.K_1: 0, pygame.K_2: 1, pygame.K_3: 2, pygame.K_4: 3}
 
-    def __init__(self):
+    def __init__(self, headless=False, speed=1):
+        Display.start(headless)
+        self.loop = GameLoop(self.update, None if headless else self.show, speed)
+        EventHandler.add_listener(pygame.KEYDOWN, self.key_down_listener)
         self.change_scene(Scenes.game)
 
     def change_scene(self, new_scene):
@@ -20,10 +39,76 @@ class Main:
     def run_frame(self):
         self.current.run_frame()
 
-    def run(self):
-        while True:
-            self.run_frame()
+    def update(self):
+        self.current.update()
+
+    def show(self):
+        self.current.show()
+
+    def run(self, max_ticks=None):
+        """ Run the game loop forever, or until max_ticks ticks have been run. """
+        self.loop.run(max_ticks)
+
+    def key_down_listener(self, event):
+        """ Change the game speed with the number keys. F3 shows the profiler overlay. """
+        if event.key in self.speed_keys and not self.fixed_speed:
+            self.loop.set_speed(GameLoop.speeds[self.speed_keys[event.key]])
+        elif event.key == pygame.K_F3:
+            Profiler.toggle_overlay()
 
 
 if __name__ == "__main__":
-    Main().run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true",
+                        help="run the game logic without a window or any drawing")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="stop after this many ticks")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="simulation speed multiplier, 0 for unlimited "
+                             "(default 1, unlimited when headless)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="time every phase and listener and write a Chrome trace here "
+                             "on exit")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record the input to this file, to replay with --replay")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay recorded input headless and as fast as possible, "
+                             "then stop")
+    args = parser.parse_args()
+
+    replayer = None
+    if args.replay:
+        replayer = InputReplayer(args.replay)
+        Display.size = replayer.display_size
+        EventHandler.source = replayer.get_events
+        args.headless = True
+        args.speed = 0
+        if args.ticks is None:
+            args.ticks = replayer.end_tick
+
+    speed = args.speed
+    if speed is None:
+        speed = 0 if args.headless else 1
+
+    main = Main(args.headless, speed or None)
+    main.fixed_speed = replayer is not None
+    recorder = None
+    if args.record:
+        recorder = InputRecorder(args.record)
+        EventHandler.recorder = recorder
+    if args.profile:
+        Profiler.enable(detailed=True)
+    start_time = time.perf_counter()
+    try:
+        main.run(args.ticks)
+    finally:
+        if recorder:
+            recorder.close()
+        if args.profile:
+            Profiler.export_trace(args.profile)
+    if replayer:
+        print("Replayed {} events".format(replayer.count))
+    if args.ticks:
+        duration = time.perf_counter() - start_time
+        print("Ran {} ticks ({:.1f}s simulated) in {:.3f}s ({:.0f} ticks/s)".format(
+            args.ticks, Clock.time, duration, args.ticks / duration))
@@ -1,92 +1,96 @@
-import math
-from engine.vector2 import Vector2
-
-
-class Node:
-
-    position = None
-    parent = None
-    cost = None
-
-    def __init__(self, position, parent, cost):
-        self.position = position
-        self.parent = parent
-        self.cost = cost
+import heapq
 
-    def __eq__(self, other):
-        return self.position == other.position
-
-    def __str__(self):
-        return "Node(({}, {}), {})".format(self.position.x, self.position.y, self.cost)
-
-    def __repr__(self):
-        return self.__str__()
+from engine.vector2 import Vector2
+from board import DIRECTIONS
 
 
 class _PathFinder:
-
-    board = None
-    candidates = None
-    visited = None
-    destination_x = None
-    final_node = None
-
-    def find_path(self, board):
-        self._setup(board)
-
-        while self.candidates and self.final_node is None:
-            self._process_next()
-
-        return self._get_path_backtrack()
-
-    def _setup(self, board):
-        """ Set the board, candidates, visited and destination. """
-        self.board = board
-        self.candidates = [Node(Vector2(-1, y), None, 0.0) for y in range(board.size.y)]  # candidate = (pos, cost)
-        self.visited = [i.position for i in self.candidates]
-        self.destination_x = self.board.size.x - 1
-        self.final_node = None
-
-    def _process_next(self):
-        """ Pop the next candidate from self.candidates.
-        If candidate is at destination, set final node, otherwise add neighbours to candidates if appropriate. """
-        self.candidates.sort(key=lambda x: -x.cost)
-        candidate = self.candidates.pop()
-
-        if candidate.position.x == self.destination_x:
-            self.final_node = candidate
-            return
-
-        for neighbour in self._get_neighbours(candidate):
-            if neighbour.position not in self.visited:
-                self.candidates.append(neighbour)
-
-        self.visited.append(candidate.position)
-
-    def _get_neighbours(self, node):
-        """ Get the empty neighbouring cells. """
-        neighbours = []
-        # for dx in range(-1, 2):
-        #     for dy in range(-1, 2):
-        #         if not (dx == 0 and dy == 0):   # Don't count the cell itself
-        #             position = node.position + Vector2(dx, dy)
-        #             if self.board.is_on_board(position):
-        #                 if self.board.get_cell_contents(position) is None:
-        #                     neighbours.append(Node(position, node, math.sqrt(abs(dx) + abs(dy))))
-        for change in [Vector2(-1, 0), Vector2(1, 0), Vector2(0, 1), Vector2(0, -1)]:
-            position = node.position + change
-            if self.board.is_on_board(position):
-                if self.board.get_cell_contents(position) is None:
-                    neighbours.append(Node(position, node, node.cost + 1))
-        return neighbours
-
-    def _get_path_backtrack(self):
-        """ Backtrack from the final_node to create the full path. is returned """
+    """ A* search from a set of entry cells to a set of exit cells.
+
+    By default the entries and exits are those of all of the board's routes - for the
+    default route, every cell in column -1 (just off the board) to every empty cell in the
+    right-most column. Entries on the board start the search at no cost, entries off it
+    start it from the board cells next to them. The search works on plain integers rather
+    than Vector2s: cells are keyed as y * board.size.x + x, the open list is a binary heap
+    and the closed set is a set of keys. The heuristic is the distance to the box around
+    the exits, which never overestimates with unit cost 4-way movement (for the default
+    route it's the number of columns left). """
+
+    def find_path(self, board, entries=None, exits=None):
+        """ Find a shortest path across the board from any of entries to any of exits
+        (Vector2s, default those of all the board's routes).
+        Returns a list of Vector2 from the entry to the exit, or an empty list if no exit can
+        be reached. """
+        width = board.size.x
+        height = board.size.y
+        free = board.get_free_bytes()
+        entries = board.get_entries() if entries is None else entries
+        exits = board.get_exits() if exits is None else exits
+        exit_keys = {cell.y * width + cell.x for cell in exits}
+        if not exit_keys:
+            return []
+        # Steps to the box around the exits, split into columns and rows
+        min_x = min(cell.x for cell in exits)
+        max_x = max(cell.x for cell in exits)
+        min_y = min(cell.y for cell in exits)
+        max_y = max(cell.y for cell in exits)
+        column_steps = [max(min_x - x, 0, x - max_x) for x in range(width)]
+        row_steps = [max(min_y - y, 0, y - max_y) for y in range(height)]
+
+        open_heap = []
+        costs = {}
+        parents = {}
+        sources = {}  # Start cell key -> the entry off the board it was stepped on to from
+        for entry in entries:
+            cost = 0 if board.is_on_board(entry) else 1
+            for cell in board.get_landing_cells(entry):
+                key = cell.y * width + cell.x
+                if free[key] and cost < costs.get(key, cost + 1):
+                    costs[key] = cost
+                    parents[key] = None
+                    sources[key] = None if cost == 0 else entry
+                    # (estimated total, -cost, x, y) - ties prefer the deepest node
+                    open_heap.append((cost + column_steps[cell.x] + row_steps[cell.y], -cost,
+                                      cell.x, cell.y))
+        heapq.heapify(open_heap)
+
+        closed = set()
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        while open_heap:
+            _, cost, x, y = heappop(open_heap)
+            key = y * width + x
+            if key in closed:
+                continue
+            if key in exit_keys:
+                return self._get_path_backtrack(parents, sources, key, width)
+            closed.add(key)
+
+            cost = 1 - cost
+            for dx, dy in DIRECTIONS:
+                nx = x + dx
+                ny = y + dy
+                if 0 <= nx < width and 0 <= ny < height and free[ny * width + nx]:
+                    neighbour = ny * width + nx
+                    if neighbour not in closed and cost < costs.get(neighbour, cost + 1):
+                        costs[neighbour] = cost
+                        parents[neighbour] = key
+                        heappush(open_heap,
+                                 (cost + column_steps[nx] + row_steps[ny], -cost, nx, ny))
+        return []
+
+    @staticmethod
+    def _get_path_backtrack(parents, sources, key, width):
+        """ Backtrack from the final key to create the full path. is returned """
         path = []
-        current = self.final_node
-        while current:
-            path.append(current.position)
-            current = current.parent
+        while True:
+            y, x = divmod(key, width)
+            path.append(Vector2(x, y))
+            if parents[key] is None:
+                break
+            key = parents[key]
+        if sources[key] is not None:
+            path.append(sources[key])
         return list(reversed(path))
 
 
@@ -1,20 +1,10 @@
 
 class Projectile:
+    """ A kind of projectile.
 
-    board = None
+    Live projectiles are rows in ProjectileManager's arrays rather than objects, so a
+    projectile class just describes how its projectiles look and how long they last. """
 
-    def __init__(self, board):
-        self.board = board
-
-    def show(self):
-        """ Show the projectile. """
-        print("Projectile has no show function")
-
-    def update(self):
-        """ Update the projectile. """
-        print("Projectile has no update function")
-
-    def is_valid(self):
-        """ Is the projectile still valid?
-        If False, projectile is removed. """
-        print("Projectile has no is_valid function")
+    color = (255, 255, 255)
+    size = 0.2  # Width in cells
+    time_to_live = 1  # Seconds
@@ -1,26 +1,106 @@
+import numpy as np
+from engine.array_store import ArrayStore
+from engine.clock import Clock
+from engine.display import Display
+from engine.draw import draw_kinds_on_board
+
 
 class _ProjectileManager:
-    """ Class to manage projecticles """
+    """ Class to manage projecticles
+
+    Every live projectile is a row in a struct of arrays (see ArrayStore): position and
+    velocity in board cells, spawn time, lifetime and kind (index into kinds, the projectile
+    classes seen so far). update moves them all in a few array operations and
+    show_projectiles draws each kind in one pass.
+
+    Rather than checking every projectile for expiry every tick, one Clock timer is kept for
+    the earliest expiry; when it runs the expired projectiles are culled in one go and the
+    timer is set for the next earliest """
 
-    projectiles = None
+    kinds = None
+    store = None
+    _expiry_timer = None
 
     def __init__(self):
-        self.projectiles = []
+        self.kinds = []
+        self.store = ArrayStore({
+            "position": (np.float32, (2,)),
+            "velocity": (np.float32, (2,)),
+            "spawn_time": (np.float64, ()),
+            "lifetime": (np.float32, ()),
+            "kind": (np.int16, ()),
+        })
+
+    @property
+    def count(self):
+        """ How many projectiles are live? """
+        return self.store.count
+
+    def get_stats(self):
+        """ Live, free and high water counts of the projectiles' rows. """
+        return self.store.get_stats()
 
-    def add_projectile(self, projectile):
-        self.projectiles.append(projectile)
+    def add_projectile(self, projectile_class, start, end):
+        """ Fire a projectile_class projectile from cell start (Vector2) to land on cell end
+        as it expires. """
+        self.add_projectiles(projectile_class,
+                             np.array([[start.x, start.y]]), np.array([[end.x, end.y]]))
 
-    def show_projectiles(self):
-        for projectile in self.projectiles:
-            projectile.show()
+    def add_projectiles(self, projectile_class, starts, ends):
+        """ Fire many projectile_class projectiles at once. starts and ends are (n, 2) arrays
+        of cells. """
+        if projectile_class not in self.kinds:
+            self.kinds.append(projectile_class)
+        rows = self.store.add(len(starts))
+        store = self.store
+        store.position[rows] = starts
+        store.velocity[rows] = (np.asarray(ends) - starts) / projectile_class.time_to_live
+        store.spawn_time[rows] = Clock.time
+        store.lifetime[rows] = projectile_class.time_to_live
+        store.kind[rows] = self.kinds.index(projectile_class)
+
+        expiry = Clock.time + projectile_class.time_to_live
+        if self._expiry_timer is None or expiry < self._expiry_timer.time:
+            self._schedule_expiry(expiry)
 
     def update(self):
-        """ Remove all projectiles that aren't valid. """
-        new_projectiles = []
-        for projectile in self.projectiles:
-            if projectile.is_valid():
-                new_projectiles.append(projectile)
-        self.projectiles = new_projectiles
+        """ Move every projectile one tick. """
+        count = self.store.count
+        if count:
+            self.store.position[:count] += self.store.velocity[:count] * Clock.dt
+
+    def expire(self):
+        """ Remove the expired projectiles and wait for the next to expire. Run by the
+        expiry timer. """
+        self._expiry_timer = None
+        store = self.store
+        count = store.count
+        expiry_times = store.spawn_time[:count] + store.lifetime[:count]
+        store.remove(expiry_times <= Clock.time)
+        if store.count:
+            self._schedule_expiry(
+                (store.spawn_time[:store.count] + store.lifetime[:store.count]).min())
+
+    def _schedule_expiry(self, time):
+        """ (Re)set the expiry timer to run at time. """
+        if self._expiry_timer is not None:
+            Clock.cancel(self._expiry_timer)
+        self._expiry_timer = Clock.schedule_at(float(time), self.expire)
+
+    def clear(self):
+        """ Remove every projectile. """
+        self.store.clear()
+        if self._expiry_timer is not None:
+            Clock.cancel(self._expiry_timer)
+            self._expiry_timer = None
+
+    def show_projectiles(self, board):
+        """ Draw every projectile on the board as a square, one pass per kind.
+        Only those in the board's viewport are drawn.
+        Returns the pygame.Rects drawn over (one bounding rect per kind). """
+        count = self.store.count
+        return draw_kinds_on_board(Display.surface, board, self.store.position[:count],
+                                   self.store.kind[:count], self.kinds)
 
 
 ProjectileManager = _ProjectileManager()
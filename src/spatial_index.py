@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class SpatialIndex:
+    """ Which units are near a point? A uniform grid of buckets, one per board cell.
+
+    Units are rows of a (n, 2) array of positions in board cells, as kept by the unit
+    managers (a position of (x, y) is the centre of cell (x, y)). build sorts the units by
+    the cell they're in and records where each cell's units start. The sort is numpy's stable
+    sort of 16 bit cell numbers, which is a radix sort (a counting sort per byte), so O(n)
+    per tick on boards of up to 65536 cells; bigger boards fall back to a merge sort. Cells
+    are numbered y * board.size.x + x, so the cells of one row of a query's bounding box
+    are neighbours in the sorted order and each row is a single slice.
+    Units off the board (eg the entry column, x = -1) go in the nearest edge cell; queries
+    check the exact distance so this only costs a few extra comparisons.
+
+    Typical usage:
+
+        index = SpatialIndex(board)
+        index.build(positions)                  # Once a tick, after the units move
+        in_range = index.query_radius(tower_cell, tower_range)
+        target = index.query_first(tower_cell, tower_range, distances)
+    """
+
+    board = None
+    positions = None
+    cells = None  # Cell of each unit
+    order = None  # Unit indices sorted by cell
+    cell_starts = None  # cell -> index into order of its first unit (cell + 1 for the end)
+
+    def __init__(self, board):
+        self.board = board
+        self.build(np.empty((0, 2), dtype=np.float32))
+
+    def build(self, positions):
+        """ Bucket the units. positions is a (n, 2) array; keep it unchanged until the next
+        build. """
+        width = self.board.size.x
+        height = self.board.size.y
+        self.positions = positions
+        self.cells = cells = self._get_cells(positions)
+        counts = np.bincount(cells, minlength=width * height)
+        self.cell_starts = np.zeros(width * height + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.cell_starts[1:])
+        if width * height <= 1 << 16:
+            cells = cells.astype(np.uint16)
+        self.order = np.argsort(cells, kind="stable")
+
+    def _get_cells(self, positions):
+        """ Bucket (flat cell index) of each position, clamped to the board. """
+        x = np.clip(np.floor(positions[:, 0] + 0.5), 0, self.board.size.x - 1).astype(np.int64)
+        y = np.clip(np.floor(positions[:, 1] + 0.5), 0, self.board.size.y - 1).astype(np.int64)
+        return y * self.board.size.x + x
+
+    def get_occupied_cells(self):
+        """ The cells (numbered y * board.size.x + x) with at least one unit in them, sorted. """
+        return np.unique(self.cells)
+
+    def is_any_occupied(self, cells):
+        """ Is there a unit in any of the cells (an array of cell numbers)? """
+        return bool(np.any(self.cell_starts[cells + 1] > self.cell_starts[cells]))
+
+    def query_radius(self, center, radius):
+        """ Indices (into positions) of the units within radius cells of center (Vector2).
+        Returns an array, in no particular order. """
+        candidates = self._get_candidates(center, radius)
+        if not candidates.size:
+            return candidates
+        offsets = self.positions[candidates] - (center.x, center.y)
+        return candidates[np.einsum("ij,ij->i", offsets, offsets) <= radius * radius]
+
+    def query_first(self, center, radius, remaining):
+        """ The unit within radius cells of center (Vector2) that is furthest along the path,
+        ie with the least remaining distance. remaining is an array of the distance each
+        unit has left to go, infinite for units that can't be picked. Returns the unit's
+        index, or None if none are in range. """
+        in_range = self.query_radius(center, radius)
+        in_range = in_range[np.isfinite(remaining[in_range])]
+        if not in_range.size:
+            return None
+        return int(in_range[np.argmin(remaining[in_range])])
+
+    def _get_candidates(self, center, radius):
+        """ Units in the cells overlapping the square around the circle. """
+        width = self.board.size.x
+        height = self.board.size.y
+        # Units are clamped into edge cells, so clamp the query the same way
+        x0 = min(max(int(np.floor(center.x - radius + 0.5)), 0), width - 1)
+        x1 = min(max(int(np.floor(center.x + radius + 0.5)), 0), width - 1)
+        y0 = max(int(np.floor(center.y - radius + 0.5)), 0)
+        y1 = min(int(np.floor(center.y + radius + 0.5)), height - 1)
+        starts = self.cell_starts
+        slices = [self.order[starts[y * width + x0]:starts[y * width + x1 + 1]]
+                  for y in range(y0, y1 + 1)]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
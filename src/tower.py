@@ -1,12 +1,24 @@
-import pygame
+from engine.assets import Assets
 from engine.display import Display
 
+from enemy_manager import EnemyManager
+from projectile_manager import ProjectileManager
+
 
 class Tower:
+    """ A tower on the board.
+
+    Towers don't run every tick; the TowerScheduler calls update when the cooldown since the
+    last shot is over. """
 
     name = "Unnamed Tower"
     icon_path = "images/missing.png"
 
+    cooldown = 1  # Seconds between shots
+    range = 3  # Cells
+    damage = 5
+    projectile = None  # Projectile class fired at the target, for show. None for no projectile
+
     position = None
     board = None
 
@@ -14,9 +26,25 @@ class Tower:
         self.position = position
         self.board = board
 
-    def show(self, cell_rect):
-        # pygame.draw.rect(Display.surface, (0, 0, 255), self.board.get_cell_rect(self.position).get_pygame_tuple())
-        pygame.draw.rect(Display.surface, (0, 0, 255), cell_rect.get_pygame_tuple())
+    def show(self, cell_rect, surface=None):
+        """ Draw the tower's icon in cell_rect on surface (default Display.surface). """
+        if surface is None:
+            surface = Display.surface
+        x, y, w, h = cell_rect.get_pygame_tuple()
+        surface.blit(Assets.get_scaled(self.icon_path, (w, h)), (x, y))
 
     def update(self):
-        pass
+        """ Shoot the enemy furthest along the path in range, if there is one.
+        Returns whether the tower shot. """
+        target = EnemyManager.get_target(self.position, self.range)
+        if target is None:
+            return False
+        self.shoot(target)
+        return True
+
+    def shoot(self, target):
+        """ Damage the target enemy (a row of EnemyManager) and fire the projectile at it. """
+        EnemyManager.damage(target, self.damage)
+        if self.projectile is not None:
+            ProjectileManager.add_projectile(self.projectile, self.position,
+                                             EnemyManager.get_position(target))
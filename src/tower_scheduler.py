@@ -0,0 +1,141 @@
+import numpy as np
+
+from engine.clock import Clock
+
+from enemy_manager import EnemyManager
+
+# Fraction of a cooldown to stagger each tower by when many are scheduled at once - the
+# golden ratio spreads any number of towers evenly
+STAGGER = 0.618034
+
+# Enemies are bucketed by the cell they're nearest the centre of, so an enemy in range of a
+# tower is in a cell whose centre is within range + half a cell diagonal
+WATCH_MARGIN = 0.7072
+
+
+class TowerScheduler:
+    """ Runs each tower's update only when it could shoot.
+
+    Every tower on the board has one Clock timer, due when its cooldown is over. When the
+    timer runs the tower updates; if it shot the timer is set a cooldown later. If there was
+    nothing in range the tower is parked: it has no timer and instead watches the cells an
+    enemy in range could be in (see WATCH_MARGIN). update, run each tick after the enemies
+    move, wakes the parked towers watching a cell with an enemy in it. A tower with enemies
+    in its watched cells but none in range yet looks again every idle_interval. So with no
+    enemies about (eg while building) no tower does anything, and each tick only the towers
+    that are due or near enemies do anything, however many towers there are or however big
+    the board is.
+
+    Towers placed together (eg a whole board loaded at once) are staggered across the
+    cooldown rather than all waking on the same tick.
+
+    Typical usage:
+
+        scheduler = TowerScheduler(board)  # Listens to the board for towers coming and going
+        ...
+        EnemyManager.update()
+        scheduler.update()
+    """
+
+    board = None
+    idle_interval = 0.1  # Seconds between looks for a target when enemies are near
+    timers = None  # position -> Clock Timer of the tower there
+    parked = None  # position -> cells (numbered y * board.size.x + x) the tower there watches
+    watchers = None  # cell -> positions of the parked towers watching it
+    watch_counts = None  # Array of how many parked towers watch each cell
+
+    def __init__(self, board):
+        self.board = board
+        self.timers = {}
+        self.parked = {}
+        self.watchers = {}
+        board.add_change_listener(self.board_changed)
+        self.schedule_all()
+
+    def board_changed(self, position):
+        """ Board change listener. Start or stop the timer for the changed cell. """
+        if position is None:
+            self.schedule_all()
+            return
+        self.cancel(position)
+        tower = self.board.towers.get(position)
+        if tower is not None:
+            self.schedule(position, tower.cooldown)
+
+    def schedule_all(self):
+        """ Drop every timer and parked tower and schedule every tower on the board,
+        staggered. """
+        for position in list(self.timers) + list(self.parked):
+            self.cancel(position)
+        self.watch_counts = np.zeros(self.board.size.x * self.board.size.y, dtype=np.int32)
+        for i, (position, tower) in enumerate(self.board.towers.items()):
+            self.schedule(position, tower.cooldown * (1 + i * STAGGER % 1))
+
+    def schedule(self, position, delay):
+        """ Update the tower at position in delay seconds. """
+        self.timers[position] = Clock.schedule(delay, lambda: self.wake(position))
+
+    def cancel(self, position):
+        """ Stop the timer for the tower at position, or unpark it. """
+        timer = self.timers.pop(position, None)
+        if timer is not None:
+            Clock.cancel(timer)
+        self.unpark(position)
+
+    def wake(self, position):
+        """ Update the tower at position and schedule its next update, or park it if there
+        are no enemies near. """
+        del self.timers[position]
+        tower = self.board.towers[position]
+        if tower.update():
+            self.schedule(position, tower.cooldown)
+            return
+        cells = self.get_watched_cells(position, tower)
+        if EnemyManager.count and EnemyManager.index.is_any_occupied(cells):
+            self.schedule(position, self.idle_interval)
+        else:
+            self.park(position, cells)
+
+    def park(self, position, cells):
+        """ Stop updating the tower at position until an enemy is in one of cells. """
+        self.parked[position] = cells
+        self.watch_counts[cells] += 1
+        for cell in cells.tolist():
+            self.watchers.setdefault(cell, set()).add(position)
+
+    def unpark(self, position):
+        """ Stop the tower at position watching its cells, if it's parked. """
+        cells = self.parked.pop(position, None)
+        if cells is None:
+            return
+        self.watch_counts[cells] -= 1
+        for cell in cells.tolist():
+            watchers = self.watchers[cell]
+            watchers.discard(position)
+            if not watchers:
+                del self.watchers[cell]
+
+    def update(self):
+        """ Wake the parked towers watching a cell an enemy is in. Run each tick after the
+        enemies move (and EnemyManager.index is rebuilt). """
+        if not self.parked or not EnemyManager.count:
+            return
+        cells = EnemyManager.index.get_occupied_cells()
+        for cell in cells[self.watch_counts[cells] > 0].tolist():
+            for position in list(self.watchers.get(cell, ())):
+                self.unpark(position)
+                self.schedule(position, 0)
+
+    def get_watched_cells(self, position, tower):
+        """ The cells (as an array of cell numbers) an enemy in range of the tower at
+        position could be in. """
+        reach = tower.range + WATCH_MARGIN
+        width = self.board.size.x
+        height = self.board.size.y
+        xs = np.arange(max(int(position.x - reach), 0),
+                       min(int(position.x + reach), width - 1) + 1)
+        ys = np.arange(max(int(position.y - reach), 0),
+                       min(int(position.y + reach), height - 1) + 1)
+        in_reach = (xs[None, :] - position.x) ** 2 + (ys[:, None] - position.y) ** 2 <= reach ** 2
+        rows, columns = np.nonzero(in_reach)
+        return ys[rows] * width + xs[columns]
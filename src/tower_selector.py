@@ -1,5 +1,4 @@
-import pygame
-
+from engine.assets import Assets
 from engine.display import Display
 from engine.ui_element import UIElement, ScaleModes
 from engine.rect import Rect
@@ -54,6 +53,10 @@ class TowerSelector(UIElement):
         self.show_area()
         self.show_towers()
 
+    def has_changed(self):
+        """Do any of the icons look different to when they were last shown?"""
+        return any(icon.has_changed() for icon in self.icons)
+
     def show_towers(self):
         for icon in self.icons:
             icon.show()
@@ -63,7 +66,7 @@ class Icon(Button):
     """Object to represent the icons on the tower selector."""
 
     tower_class = None
-    image = None
+    icon_scale = 0.8  # Icon size relative to the button, leaving a border to show hovering
 
     def __init__(self,
                  tower_class,
@@ -76,8 +79,12 @@ class Icon(Button):
                  ):
         super().__init__(rect, scale_mode, offset, offset_mode)
         self.tower_class = tower_class
-        self.image = pygame.image.load(tower_class.icon_path)
+        Assets.get_image(tower_class.icon_path)  # Load now rather than on the first show
 
-    # def show(self, rect):
-    #     image = pygame.transform.scale(self.image, rect.get_size().get_pygame_tuple())
-    #     Display.surface.blit(image, rect.get_top_left().get_pygame_tuple())
+    def show(self):
+        """Show the button with the tower's icon over it."""
+        super().show()
+        rect = self.get_final_rect()
+        size = (int(rect.w * self.icon_scale), int(rect.h * self.icon_scale))
+        Display.surface.blit(Assets.get_scaled(self.tower_class.icon_path, size),
+                             (int(rect.x - size[0] / 2), int(rect.y - size[1] / 2)))